@@ -1,14 +1,14 @@
 import streamlit as st
-import requests
 import pandas as pd
 import plotly.express as px
-import fitz  # PyMuPDF
 import json
 from openai import OpenAI
-import tempfile
-import speech_recognition as sr
 from st_audiorec import st_audiorec
 
+from chat_ingest import MAX_PDF_BYTES, IngestionError, IngestionPipeline
+from chat_intent import extract_intent
+from risk_client import RiskAPIClient
+
 # --- Set your OpenAI API Key ---
 api_key = st.secrets['API_KEY']
 
@@ -18,6 +18,33 @@ API_URL = "https://scsphackathon.onrender.com"
 
 st.set_page_config(page_title="Supply Chain Risk Dashboard", layout="wide")
 
+
+@st.cache_resource
+def get_risk_client():
+    # One pooled session and response cache shared by every user session
+    return RiskAPIClient(API_URL)
+
+
+@st.cache_resource
+def get_ingestion():
+    # Shared worker pool for PDF/audio decoding, memoized by upload content
+    return IngestionPipeline()
+
+
+risk_client = get_risk_client()
+ingestion = get_ingestion()
+YEARS = list(range(2015, 2024))
+POLL_SECONDS = 0.5
+
+
+@st.fragment(run_every=POLL_SECONDS)
+def await_ingestion(future, message):
+    # Re-runs on its own until the worker finishes, then re-runs the whole
+    # page so the caller picks up the result without blocking on it
+    if future.done():
+        st.rerun()
+    st.info(message)
+
 # --- Tabs ---
 tab1, tab2 = st.tabs(["Risk Dashboard", "Chatbot"])
 
@@ -74,17 +101,15 @@ with tab1:
 
     commodity = st.selectbox("Choose Commodity", commodity_list)
 
-    year = st.selectbox("Select Year", list(range(2015, 2024)))
+    year = st.selectbox("Select Year", YEARS)
     top_n = st.slider("Number of Top Risky Countries", min_value=1, max_value=10, value=3)
+    if st.checkbox("Prefetch all years for this commodity", value=True):
+        risk_client.prefetch(commodity, YEARS)
 
     if st.button("Get Risk Data"):
         with st.spinner("Fetching data..."):
-            response = requests.get(
-                f"{API_URL}/top-risk-countries/",
-                params={"commodity": commodity, "year": year, "top_n": top_n}
-            )
-            if response.status_code == 200:
-                data = response.json()
+            data = risk_client.top_risks(commodity, year, top_n)
+            if data is not None:
                 top_risks = pd.DataFrame(data["top_risks"])
                 st.success(f"Top {top_n} Risky Countries for {commodity} in {year}")
                 st.dataframe(top_risks)
@@ -104,12 +129,9 @@ with tab2:
     option = st.radio("Choose input method:", ["Ask a Question", "Upload a PDF", "Voice Query"])
 
     def handle_risk_fetch(commodity, year, title_prefix="", only_political=True):
-        res = requests.get(
-            f"{API_URL}/risk-score/",
-            params={"commodity": commodity, "year": year, "only_political": only_political}
-        )
-        if res.status_code == 200:
-            risk_data = pd.DataFrame(res.json()["all_countries"])
+        data = risk_client.risk_scores(commodity, year)
+        if data is not None:
+            risk_data = pd.DataFrame(data["all_countries"])
             st.dataframe(risk_data)
             fig = px.bar(risk_data.head(10), x="Country", y="RiskPercentage",
                          title=f"{title_prefix}{commodity} ({year})",
@@ -119,6 +141,24 @@ with tab2:
         else:
             st.error("Risk data not found for extracted parameters.")
 
+    def stream_answer(messages):
+        # Show tokens as they arrive (same stream=True pattern as the `OpenAI API` script)
+        stream = client.chat.completions.create(model="gpt-4", messages=messages, stream=True)
+        st.markdown("### 🤖 Response")
+        return st.write_stream(
+            chunk.choices[0].delta.content for chunk in stream
+            if chunk.choices and chunk.choices[0].delta.content
+        )
+
+    def local_risk_fetch(text, title_prefix):
+        # Skip the LLM when the commodity and year can be read straight off the text
+        intent = extract_intent(text, commodity_list, YEARS)
+        if intent is None:
+            return False
+        st.info(f"Detected Commodity: {intent[0]} | Year: {intent[1]}")
+        handle_risk_fetch(intent[0], intent[1], title_prefix=title_prefix)
+        return True
+
 
     if option == "Ask a Question":
         user_query = st.text_area("Enter your question:")
@@ -126,44 +166,44 @@ with tab2:
         if st.button("Ask"):
             if not user_query.strip():
                 st.warning("Please enter a question.")
-            else:
-                with st.spinner("Thinking..."):
+            elif not local_risk_fetch(user_query, "Top Risk Countries by Political Risk: "):
+                try:
+                    answer = stream_answer([
+                        {"role": "system", "content": (
+                            "You are a helpful assistant for supply chain risk analysis. "
+                            "If the user asks about commodities or years, try to extract a JSON with keys 'commodity' and 'year'. "
+                            "Otherwise, answer their question normally.")},
+                        {"role": "user", "content": user_query}
+                    ])
+
+                    # Try parsing JSON if present
                     try:
-                        response = client.chat.completions.create(
-                            model="gpt-4",
-                            messages=[
-                                {"role": "system", "content": (
-                                    "You are a helpful assistant for supply chain risk analysis. "
-                                    "If the user asks about commodities or years, try to extract a JSON with keys 'commodity' and 'year'. "
-                                    "Otherwise, answer their question normally.")},
-                                {"role": "user", "content": user_query}
-                            ]
-                        )
-
-                        answer = response.choices[0].message.content
-                        st.markdown("### 🤖 Response")
-                        st.markdown(answer)
-
-                        # Try parsing JSON if present
-                        try:
-                            result = json.loads(answer)
-                            if "commodity" in result and "year" in result:
-                                st.info(f"Detected Commodity: {result['commodity']} | Year: {result['year']}")
-                                handle_risk_fetch(result['commodity'], int(result['year']),
-                                                  title_prefix="Top Risk Countries by Political Risk: ")
-                        except json.JSONDecodeError:
-                            pass
+                        result = json.loads(answer)
+                        if "commodity" in result and "year" in result:
+                            st.info(f"Detected Commodity: {result['commodity']} | Year: {result['year']}")
+                            handle_risk_fetch(result['commodity'], int(result['year']),
+                                              title_prefix="Top Risk Countries by Political Risk: ")
+                    except json.JSONDecodeError:
+                        pass
 
-                    except Exception as e:
-                        st.error(f"Error: {str(e)}")
+                except Exception as e:
+                    st.error(f"Error: {str(e)}")
 
 
     elif option == "Upload a PDF":
         uploaded_file = st.file_uploader("Upload PDF", type=["pdf"])
-        if uploaded_file:
-            with st.spinner("Extracting text from PDF..."):
-                pdf = fitz.open(stream=uploaded_file.read(), filetype="pdf")
-                full_text = "".join(page.get_text() for page in pdf)
+        if uploaded_file and uploaded_file.size > MAX_PDF_BYTES:
+            st.error(f"PDF is too large (limit {MAX_PDF_BYTES // (1024 * 1024)} MB).")
+        elif uploaded_file:
+            future = ingestion.submit_pdf(uploaded_file.getvalue())
+            if not future.done():
+                await_ingestion(future, "Extracting text from PDF...")
+                st.stop()
+            try:
+                full_text = future.result()
+            except (IngestionError, RuntimeError) as e:
+                st.error(f"Could not read PDF: {e}")
+                st.stop()
 
             st.text_area("Extracted Text (Preview)", full_text[:1000], height=200)
 
@@ -197,36 +237,25 @@ Text: {full_text[:3000]}
         wav_audio_data = st_audiorec()
 
         if wav_audio_data is not None:
-            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as f:
-                f.write(wav_audio_data)
-                file_path = f.name
-
-            recognizer = sr.Recognizer()
-            with sr.AudioFile(file_path) as source:
-                audio = recognizer.record(source)
-
+            future = ingestion.submit_audio(wav_audio_data)
+            if not future.done():
+                await_ingestion(future, "Transcribing...")
+                st.stop()
             try:
-                transcript = recognizer.recognize_google(audio)
+                transcript = future.result()
                 st.success(f"Transcribed: {transcript}")
 
-                if st.button("Ask from Voice"):
-                    with st.spinner("Thinking..."):
-                        response = client.chat.completions.create(
-                            model="gpt-4",
-                            messages=[
-                                {"role": "system", "content": "You answer supply chain risk questions. Extract commodity and year if available and return JSON."},
-                                {"role": "user", "content": transcript}
-                            ]
-                        )
-                        content = response.choices[0].message.content
-                        st.markdown("### 🤖 Response")
-                        st.markdown(content)
-
-                        try:
-                            result = json.loads(content)
-                            handle_risk_fetch(result["commodity"], int(result["year"]), title_prefix="Voice Risk Report: ")
-                        except json.JSONDecodeError:
-                            pass
+                if st.button("Ask from Voice") and not local_risk_fetch(transcript, "Voice Risk Report: "):
+                    content = stream_answer([
+                        {"role": "system", "content": "You answer supply chain risk questions. Extract commodity and year if available and return JSON."},
+                        {"role": "user", "content": transcript}
+                    ])
+
+                    try:
+                        result = json.loads(content)
+                        handle_risk_fetch(result["commodity"], int(result["year"]), title_prefix="Voice Risk Report: ")
+                    except json.JSONDecodeError:
+                        pass
 
             except Exception as e:
                 st.error(f"Voice recognition error: {e}")
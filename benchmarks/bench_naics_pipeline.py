@@ -0,0 +1,76 @@
+"""Compare sequential and concurrent component mapping against a fake client.
+
+    python benchmarks/bench_naics_pipeline.py --latency 0.2 --components 12
+
+No network access or API key is needed: ``FakeAsyncClient`` answers every
+chat request after a fixed delay. The last two runs go through a fresh
+``SQLiteLLMCache``: the cold run fills it, and the warm run repeats the same
+lookups without a single chat call.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm_cache import SQLiteLLMCache  # noqa: E402
+from policymaker_ai import ProductToNAICSPipeline  # noqa: E402
+
+
+class FakeAsyncClient:
+    """Stands in for ``AsyncOpenAI``; only ``chat.completions.create`` is used."""
+
+    def __init__(self, latency: float, components: int):
+        self.latency = latency
+        self.components = [f"component {i}" for i in range(components)]
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, model, messages, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        if "decompose" in messages[0]["content"]:
+            content = json.dumps(self.components)
+        else:
+            content = json.dumps({"NAICS_code": "334111", "NAICS_label": "Electronic Computer Manufacturing"})
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+async def timed_lookup(products, latency, components, max_concurrency, cache=None):
+    client = FakeAsyncClient(latency, components)
+    pipeline = ProductToNAICSPipeline(client, cache=cache, max_concurrency=max_concurrency)
+    started = time.perf_counter()
+    await pipeline.lookup_products(products)
+    return time.perf_counter() - started, client.calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per fake chat call")
+    parser.add_argument("--components", type=int, default=12)
+    parser.add_argument("--products", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    products = [f"product {i}" for i in range(args.products)]
+    for label, limit in (("sequential", 1), ("concurrent", args.concurrency)):
+        seconds, calls = asyncio.run(timed_lookup(products, args.latency, args.components, limit))
+        print(f"{label:>10} (limit={limit}): {calls} calls in {seconds:.2f}s")
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache = SQLiteLLMCache(os.path.join(directory, "llm_cache.sqlite3"))
+        for label in ("cold cache", "warm cache"):
+            seconds, calls = asyncio.run(timed_lookup(products, args.latency, args.components,
+                                                      args.concurrency, cache))
+            print(f"{label:>10} (limit={args.concurrency}): {calls} calls in {seconds:.2f}s")
+        print(f"cache: {cache.stats()}")
+        cache.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""Benchmark the risk pipeline stages and API endpoints on synthetic data.
+
+    python benchmarks/bench_risk_pipeline.py --scales 1,10,100 --requests 2000 --concurrency 32
+
+Each scale multiplies the number of countries. For every scale the
+pipeline stages are timed one by one, a snapshot is built into a temporary
+directory, and the FastAPI app is driven in-process through
+``httpx.ASGITransport``: no network, no Google Drive. Use ``--json`` to keep
+results for comparing runs.
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+# risk_api reads its snapshot directory at import time
+SNAPSHOT_DIR = tempfile.mkdtemp(prefix="risk-bench-")
+os.environ["RISK_SNAPSHOT_DIR"] = SNAPSHOT_DIR
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import httpx  # noqa: E402
+
+import risk_pipeline  # noqa: E402
+from risk_engine import DEFAULT_WEIGHTS, RiskEngine  # noqa: E402
+from synthetic_data import generate_sources, to_raw  # noqa: E402
+
+
+def timed(results: dict, stage: str, fn, *args):
+    started = time.perf_counter()
+    value = fn(*args)
+    results[stage] = round((time.perf_counter() - started) * 1000, 2)
+    return value
+
+
+# --- Pipeline Stages ---
+def bench_stages(raw: dict) -> dict:
+    ms = {}
+    frames = timed(ms, "read_sources", risk_pipeline.read_sources, raw)
+    wgi = timed(ms, "wgi_pivot", risk_pipeline.clean_wgi, frames["wgi"])
+    cleaned = timed(ms, "clean_other", lambda: {
+        "imports": risk_pipeline.clean_imports(frames["imports"]),
+        "lpi": risk_pipeline.clean_lpi(frames["lpi"]),
+        "wgi": wgi,
+        "consumption": risk_pipeline.clean_consumption(frames["consumption"]),
+    })
+    merged = timed(ms, "merges", risk_pipeline.merge_sources, cleaned)
+    filtered_df = timed(ms, "filter", risk_pipeline.filter_valid, merged)
+    filtered_df = timed(ms, "normalize", risk_pipeline.normalize, filtered_df)
+    features_df = timed(ms, "feature_table", risk_pipeline.feature_table, filtered_df)
+    engine = timed(ms, "engine_build", RiskEngine, features_df)
+    timed(ms, "group_rescoring", engine.risk_percentage, DEFAULT_WEIGHTS)
+    ms["rows"] = len(features_df)
+    ms["groups"] = len(engine.group_keys)
+    return ms
+
+
+# --- Endpoints ---
+async def drive(app, requests: list, concurrency: int) -> dict:
+    """Send ``(method, path, params_or_body)`` requests and summarize latency."""
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one(method, path, payload):
+            async with semaphore:
+                started = time.perf_counter()
+                if method == "GET":
+                    response = await client.get(path, params=payload)
+                else:
+                    response = await client.post(path, json=payload)
+                latencies.append((time.perf_counter() - started) * 1000)
+                response.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(*request) for request in requests))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies), 3),
+        "p95_ms": round(latencies[int(0.95 * (len(latencies) - 1))], 3),
+        "p99_ms": round(latencies[int(0.99 * (len(latencies) - 1))], 3),
+    }
+
+
+def bench_endpoints(app, keys: list, n_requests: int, concurrency: int) -> dict:
+    def cycle(make):
+        return [make(*keys[i % len(keys)]) for i in range(n_requests)]
+
+    scenarios = {
+        "top-risk-countries": cycle(lambda c, y: ("GET", "/top-risk-countries/",
+                                                  {"commodity": c, "year": y, "top_n": 3})),
+        "risk-score": cycle(lambda c, y: ("GET", "/risk-score/", {"commodity": c, "year": y})),
+        "risk-score weights": cycle(lambda c, y: ("GET", "/risk-score/",
+                                                  {"commodity": c, "year": y, "weights": "0.25,0.25,0.25,0.25"})),
+        "batch x50": [("POST", "/risk-scores/batch",
+                       {"queries": [{"commodity": c, "year": y} for c, y in keys[:50]]})
+                      for _ in range(max(n_requests // 50, 1))],
+    }
+    return {name: asyncio.run(drive(app, requests, concurrency)) for name, requests in scenarios.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", default="1,10", help="comma-separated multipliers of --countries")
+    parser.add_argument("--countries", type=int, default=20)
+    parser.add_argument("--commodities", type=int, default=140)
+    parser.add_argument("--years", type=int, default=13)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    risk_api = None
+    results = []
+    for scale in (int(s) for s in args.scales.split(",")):
+        frames = generate_sources(args.countries * scale, args.commodities, args.years, seed=scale)
+        raw = to_raw(frames)
+        stages = bench_stages(raw)
+        risk_pipeline.build_snapshot(SNAPSHOT_DIR, raw=raw)
+
+        if risk_api is None:
+            risk_api = importlib.import_module("risk_api")
+        else:
+            risk_api.reload_snapshot(x_admin_token=None)
+        keys = list(risk_api.risk_table.engine.group_keys)
+        endpoints = bench_endpoints(risk_api.app, keys, args.requests, args.concurrency)
+
+        results.append({"scale": scale, "countries": args.countries * scale,
+                        "stages_ms": stages, "endpoints": endpoints})
+        print(f"\n== scale x{scale}: {stages['rows']} rows, {stages['groups']} groups ==")
+        for stage, value in stages.items():
+            if stage not in ("rows", "groups"):
+                print(f"  {stage:<16} {value:>10.2f} ms")
+        for name, summary in endpoints.items():
+            print(f"  {name:<20} {summary['rps']:>9.1f} req/s  p50 {summary['p50_ms']:.2f} ms  "
+                  f"p99 {summary['p99_ms']:.2f} ms")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Synthetic imports, LPI, WGI and consumption sources for the risk pipeline.
+
+The frames follow the layouts ``risk_pipeline.py`` reads from Google Drive,
+including the "World Total" imports rows and the ".." placeholders in the
+long-format WGI estimates, so the real pipeline runs on them unchanged.
+
+    python benchmarks/synthetic_data.py --countries 200 --commodities 140 --years 13 --out data/
+"""
+import argparse
+import io
+import os
+
+import numpy as np
+import pandas as pd
+
+WGI_INDICATORS = ["cc", "ge", "rl", "rq", "va", "pv"]
+
+
+def generate_sources(n_countries: int = 60, n_commodities: int = 140, n_years: int = 13,
+                     start_year: int = 2012, density: float = 0.6, missing_wgi: float = 0.05,
+                     seed: int = 0) -> dict:
+    """Return raw ``{"imports", "lpi", "wgi", "consumption"}`` frames.
+
+    Each country imports each commodity in a given year with probability
+    ``density``; ``missing_wgi`` of the WGI estimates are "..".
+    """
+    rng = np.random.default_rng(seed)
+    countries = np.array([f"Country {i:04d}" for i in range(n_countries)], dtype=object)
+    commodities = np.array([f"Commodity {j:04d}" for j in range(n_commodities)], dtype=object)
+    years = np.arange(start_year, start_year + n_years)
+
+    # --- Imports (Country x Commodity x Year, sparse) ---
+    c, k, y = np.meshgrid(np.arange(n_countries), np.arange(n_commodities), years, indexing="ij")
+    keep = rng.random(c.size) < density
+    imports = pd.DataFrame({
+        "Country": countries[c.ravel()[keep]],
+        "Year": y.ravel()[keep],
+        "Commodity": commodities[k.ravel()[keep]],
+        "ImportValueUSD": np.round(rng.lognormal(mean=14, sigma=2, size=int(keep.sum())), 2),
+    })
+    totals = imports.groupby(["Year", "Commodity"], as_index=False)["ImportValueUSD"].sum()
+    totals.insert(0, "Country", "World Total")
+    imports = pd.concat([imports, totals[imports.columns]], ignore_index=True)
+
+    # --- LPI (Country x Year) ---
+    cy_country, cy_year = np.meshgrid(np.arange(n_countries), years, indexing="ij")
+    lpi = pd.DataFrame({
+        "Country": countries[cy_country.ravel()],
+        "Year": cy_year.ravel(),
+        "LPI_Score_Interpolated": np.round(rng.uniform(1.5, 4.5, size=cy_country.size), 3),
+    })
+
+    # --- WGI (long format: countryname, year, indicator, estimate with "..") ---
+    w_country, w_year, w_indicator = np.meshgrid(
+        np.arange(n_countries), years, np.arange(len(WGI_INDICATORS)), indexing="ij")
+    estimates = np.round(rng.normal(0, 1, size=w_country.size), 4).astype(object)
+    estimates[rng.random(w_country.size) < missing_wgi] = ".."
+    wgi = pd.DataFrame({
+        "countryname": countries[w_country.ravel()],
+        "year": w_year.ravel(),
+        "indicator": np.array(WGI_INDICATORS, dtype=object)[w_indicator.ravel()],
+        "estimate": estimates,
+    })
+
+    # --- Consumption (Year x Commodity) ---
+    k_year, k_commodity = np.meshgrid(years, np.arange(n_commodities), indexing="ij")
+    consumption = pd.DataFrame({
+        "Year": k_year.ravel(),
+        "Commodity type": commodities[k_commodity.ravel()],
+        "Overall consumption percentage": np.round(rng.uniform(0, 100, size=k_year.size), 2),
+    })
+
+    return {"imports": imports, "lpi": lpi, "wgi": wgi, "consumption": consumption}
+
+
+def to_raw(frames: dict) -> dict:
+    """Serialize frames to the file bytes ``risk_pipeline.build_snapshot`` expects."""
+    raw = {}
+    for name, frame in frames.items():
+        buffer = io.BytesIO()
+        if name == "wgi":
+            frame.to_excel(buffer, index=False)
+        else:
+            frame.to_csv(buffer, index=False)
+        raw[name] = buffer.getvalue()
+    return raw
+
+
+def write_sources(frames: dict, directory: str):
+    os.makedirs(directory, exist_ok=True)
+    for name, data in to_raw(frames).items():
+        extension = "xlsx" if name == "wgi" else "csv"
+        with open(os.path.join(directory, f"{name}.{extension}"), "wb") as f:
+            f.write(data)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write synthetic risk pipeline sources.")
+    parser.add_argument("--countries", type=int, default=60)
+    parser.add_argument("--commodities", type=int, default=140)
+    parser.add_argument("--years", type=int, default=13)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="synthetic_sources")
+    args = parser.parse_args()
+
+    frames = generate_sources(args.countries, args.commodities, args.years, seed=args.seed)
+    write_sources(frames, args.out)
+    print({name: len(frame) for name, frame in frames.items()})
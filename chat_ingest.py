@@ -0,0 +1,77 @@
+"""Bounded, off-thread ingestion of chatbot uploads (PDFs and voice clips).
+
+PDF pages are extracted lazily and extraction stops once the character
+budget the prompt actually uses is filled. Audio is decoded from an
+in-memory buffer instead of a temp file. Work runs on a small thread pool
+and results are memoized by content hash, so Streamlit reruns of the same
+upload don't redo it.
+"""
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import fitz  # PyMuPDF
+import speech_recognition as sr
+
+PDF_CHAR_BUDGET = 3000          # characters sent to the model
+MAX_PDF_PAGES = 50
+MAX_PDF_BYTES = 25 * 1024 * 1024
+MAX_AUDIO_BYTES = 10 * 1024 * 1024
+
+
+class IngestionError(ValueError):
+    pass
+
+
+def extract_pdf_text(data: bytes, char_budget: int = PDF_CHAR_BUDGET, max_pages: int = MAX_PDF_PAGES) -> str:
+    if len(data) > MAX_PDF_BYTES:
+        raise IngestionError(f"PDF is larger than {MAX_PDF_BYTES // (1024 * 1024)} MB.")
+    parts, length = [], 0
+    with fitz.open(stream=data, filetype="pdf") as pdf:
+        for page_number in range(min(pdf.page_count, max_pages)):
+            text = pdf.load_page(page_number).get_text()
+            parts.append(text)
+            length += len(text)
+            if length >= char_budget:
+                break
+    return "".join(parts)[:char_budget]
+
+
+def transcribe_wav(data: bytes) -> str:
+    if len(data) > MAX_AUDIO_BYTES:
+        raise IngestionError(f"Recording is larger than {MAX_AUDIO_BYTES // (1024 * 1024)} MB.")
+    recognizer = sr.Recognizer()
+    with sr.AudioFile(io.BytesIO(data)) as source:
+        audio = recognizer.record(source)
+    return recognizer.recognize_google(audio)
+
+
+class IngestionPipeline:
+    def __init__(self, max_workers: int = 2, max_cached: int = 32):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingest")
+        self.max_cached = max_cached
+        self._results: "OrderedDict[tuple, Future]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _submit(self, kind: str, fn, data: bytes) -> Future:
+        key = (kind, hashlib.sha256(data).hexdigest())
+        with self._lock:
+            future = self._results.get(key)
+            if future is not None and not (future.done() and future.exception() is not None):
+                self._results.move_to_end(key)
+                return future
+            future = self.executor.submit(fn, data)
+            self._results[key] = future
+            while len(self._results) > self.max_cached:
+                self._results.popitem(last=False)
+        return future
+
+    def submit_pdf(self, data: bytes) -> Future:
+        """Future for the first ``PDF_CHAR_BUDGET`` characters of the PDF."""
+        return self._submit("pdf", extract_pdf_text, data)
+
+    def submit_audio(self, data: bytes) -> Future:
+        """Future for the transcript of a WAV recording."""
+        return self._submit("audio", transcribe_wav, data)
@@ -0,0 +1,66 @@
+"""Local commodity/year extraction for the Streamlit chatbot.
+
+Most questions name a commodity from ``commodity_list`` and a year
+verbatim, so they can go straight to the risk API without an LLM round
+trip. ``extract_intent`` returns ``(commodity, year)`` only when both are
+found confidently; anything else falls through to the model.
+"""
+import re
+from difflib import SequenceMatcher
+from typing import Iterable, List, Optional, Tuple
+
+MIN_COMMODITY_SCORE = 0.85
+YEAR_PATTERN = re.compile(r"\b(19|20)\d{2}\b")
+
+
+def _normalize(text: str) -> str:
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", text.lower()).split())
+
+
+def extract_year(text: str, years: Iterable[int]) -> Optional[int]:
+    allowed = set(years)
+    for match in YEAR_PATTERN.finditer(text):
+        year = int(match.group(0))
+        if year in allowed:
+            return year
+    return None
+
+
+def match_commodity(text: str, commodities: List[str],
+                    min_score: float = MIN_COMMODITY_SCORE) -> Optional[Tuple[str, float]]:
+    """Best ``(commodity, score)`` mentioned in ``text``, or None.
+
+    A commodity whose normalized name appears in the text scores 1.0 (the
+    longest such name wins). Otherwise every word window of the same length
+    as a commodity name is compared with ``difflib``.
+    """
+    query = _normalize(text)
+    padded = f" {query} "
+    verbatim = [c for c in commodities if _normalize(c) and f" {_normalize(c)} " in padded]
+    if verbatim:
+        return max(verbatim, key=lambda c: len(_normalize(c))), 1.0
+
+    words = query.split()
+    best, best_score = None, 0.0
+    for commodity in commodities:
+        name = _normalize(commodity)
+        width = len(name.split())
+        for start in range(max(len(words) - width + 1, 1)):
+            window = " ".join(words[start:start + width])
+            score = SequenceMatcher(None, name, window).ratio()
+            if score > best_score:
+                best, best_score = commodity, score
+    if best is None or best_score < min_score:
+        return None
+    return best, best_score
+
+
+def extract_intent(text: str, commodities: List[str], years: Iterable[int],
+                   min_score: float = MIN_COMMODITY_SCORE) -> Optional[Tuple[str, int]]:
+    year = extract_year(text, years)
+    if year is None:
+        return None
+    match = match_commodity(text, commodities, min_score)
+    if match is None:
+        return None
+    return match[0], year
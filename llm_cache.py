@@ -0,0 +1,124 @@
+"""Persistent cache for deterministic chat completions.
+
+The agents in ``policymaker_ai.py`` call the chat API with
+``temperature=0.0``, so a (model, system prompt, user prompt) triple always
+maps to the same answer. ``SQLiteLLMCache`` keeps those answers on disk with
+LRU eviction, a TTL and hit/miss counters; any object with the same
+``get``/``set`` methods can be plugged in instead.
+
+``get`` runs inside the event loop, so a hit only reads: its new
+``last_used`` time is kept in memory and written in one batch on the next
+``set`` (before eviction), every ``TOUCH_BATCH`` hits, or on ``close``.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+LLM_CACHE_PATH = os.environ.get("LLM_CACHE_PATH", "llm_cache.sqlite3")
+TOUCH_BATCH = 256  # hits buffered before their last_used times are written
+
+
+def cache_key(model: str, system_prompt: str, user_prompt: str) -> str:
+    payload = json.dumps([model, system_prompt, user_prompt], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """In-memory cache; also the interface other backends implement."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[str, str] = {}
+
+    def get(self, model: str, system_prompt: str, user_prompt: str) -> Optional[str]:
+        value = self._entries.get(cache_key(model, system_prompt, user_prompt))
+        self._count(value)
+        return value
+
+    def set(self, model: str, system_prompt: str, user_prompt: str, value: str):
+        self._entries[cache_key(model, system_prompt, user_prompt)] = value
+
+    def _count(self, value: Optional[str]):
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+
+class SQLiteLLMCache(LLMCache):
+    def __init__(self, path: str = LLM_CACHE_PATH, max_entries: int = 10_000,
+                 ttl_seconds: Optional[float] = 30 * 24 * 3600):
+        super().__init__()
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._touched: Dict[str, float] = {}  # key -> last_used not yet written
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS completions ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " created_at REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS completions_last_used ON completions (last_used)")
+        self._conn.commit()
+
+    def get(self, model: str, system_prompt: str, user_prompt: str) -> Optional[str]:
+        key = cache_key(model, system_prompt, user_prompt)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+            value = None
+            # An expired row reads as a miss; the answer fetched next replaces it
+            if row is not None and (self.ttl_seconds is None or now - row[1] <= self.ttl_seconds):
+                value = row[0]
+                self._touched[key] = now
+                if len(self._touched) >= TOUCH_BATCH:
+                    self._flush_touched()
+                    self._conn.commit()
+            self._count(value)
+        return value
+
+    def _flush_touched(self):
+        # Caller holds the lock and commits
+        if self._touched:
+            self._conn.executemany("UPDATE completions SET last_used = ? WHERE key = ?",
+                                   [(used, key) for key, used in self._touched.items()])
+            self._touched.clear()
+
+    def set(self, model: str, system_prompt: str, user_prompt: str, value: str):
+        key = cache_key(model, system_prompt, user_prompt)
+        now = time.time()
+        with self._lock:
+            self._flush_touched()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO completions (key, value, created_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            # Evict least recently used entries beyond the size bound
+            self._conn.execute(
+                "DELETE FROM completions WHERE key IN ("
+                " SELECT key FROM completions ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": entries}
+
+    def close(self):
+        with self._lock:
+            self._flush_touched()
+            self._conn.commit()
+            self._conn.close()
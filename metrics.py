@@ -0,0 +1,191 @@
+"""Minimal Prometheus-style metrics shared by the API and the LLM pipeline.
+
+Counters, gauges and histograms with labels, rendered in the Prometheus
+text exposition format by ``Registry.render``. Values live in process, so
+with several uvicorn workers each worker reports its own.
+"""
+import bisect
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LLM_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(labels)
+        self._values: Dict[Tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict) -> Tuple:
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def samples(self):
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        lines += [f"{name}{labels} {_number(value)}" for name, labels, value in self.samples()]
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [(self.name, _labels(self.label_names, key), value) for key, value in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Iterable[str] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    def samples(self):
+        with self._lock:
+            items = [(key, list(counts), total) for key, (counts, total) in self._values.items()]
+        samples = []
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                samples.append((f"{self.name}_bucket",
+                                _labels(self.label_names, key, f'le="{_number(float(bound))}"'), cumulative))
+            samples.append((f"{self.name}_sum", _labels(self.label_names, key), total))
+            samples.append((f"{self.name}_count", _labels(self.label_names, key), cumulative))
+        return samples
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help_text: str, labels: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labels))
+
+    def gauge(self, name: str, help_text: str, labels: Iterable[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, labels))
+
+    def histogram(self, name: str, help_text: str, labels: Iterable[str] = (),
+                  buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labels, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+
+# --- LLM Instrumentation ---
+class LLMMetrics:
+    """Hook for ``policymaker_ai.chat_completion`` and its agents.
+
+    Records per-agent call latency, token usage, retries, cache hits and
+    how often a reply had to fall back from strict JSON parsing.
+    """
+
+    def __init__(self, registry: Optional[Registry] = None):
+        registry = registry or REGISTRY
+        self.latency = registry.histogram("llm_call_seconds", "Chat completion latency, including retries.",
+                                          ["agent", "cached"], LLM_LATENCY_BUCKETS)
+        self.tokens = registry.counter("llm_tokens_total", "Tokens used by chat completions.", ["agent", "kind"])
+        self.retries = registry.counter("llm_retries_total", "Chat completion retries after rate limits or timeouts.",
+                                        ["agent"])
+        self.parses = registry.counter("llm_json_parses_total", "Agent replies parsed, by outcome.",
+                                       ["agent", "outcome"])
+
+    def record_call(self, agent: str, seconds: float, retries: int = 0, cached: bool = False,
+                    prompt_tokens: int = 0, completion_tokens: int = 0):
+        self.latency.observe(seconds, agent=agent, cached=str(cached).lower())
+        if retries:
+            self.retries.inc(retries, agent=agent)
+        if prompt_tokens:
+            self.tokens.inc(prompt_tokens, agent=agent, kind="prompt")
+        if completion_tokens:
+            self.tokens.inc(completion_tokens, agent=agent, kind="completion")
+
+    def record_parse(self, agent: str, fallback: bool):
+        self.parses.inc(agent=agent, outcome="fallback" if fallback else "json")
+
+    def summary(self) -> Dict[str, Dict]:
+        """Per-agent calls, mean latency, tokens, retries and fallback rate."""
+        summary: Dict[str, Dict] = {}
+
+        def entry(agent: str) -> Dict:
+            return summary.setdefault(agent, {"calls": 0, "seconds": 0.0})
+
+        for (agent, _), (counts, total) in list(self.latency._values.items()):
+            entry(agent)["calls"] += sum(counts)
+            entry(agent)["seconds"] += total
+        for (agent, kind), value in list(self.tokens._values.items()):
+            entry(agent)[f"{kind}_tokens"] = value
+        for (agent,), value in list(self.retries._values.items()):
+            entry(agent)["retries"] = value
+        for (agent, outcome), value in list(self.parses._values.items()):
+            entry(agent)[f"{outcome}_parses"] = value
+        for stats in summary.values():
+            stats["mean_seconds"] = round(stats.pop("seconds") / stats["calls"], 3) if stats["calls"] else 0.0
+            parsed = stats.get("json_parses", 0) + stats.get("fallback_parses", 0)
+            if parsed:
+                stats["fallback_rate"] = round(stats.get("fallback_parses", 0) / parsed, 3)
+        return summary
@@ -0,0 +1,118 @@
+"""In-memory NAICS / end-use crosswalk index.
+
+Loaded once from ``end_use.csv`` (``NAICS_code``, ``END_USE``) and used by
+``ProductToNAICSPipeline`` to answer component lookups locally before
+falling back to the LLM. Names are indexed by word tokens and scored with
+the Dice coefficient of the two token sets, so tokens missing on either side
+count against a match: "motor" alone is far from "Motor Vehicle Body
+Manufacturing". The crosswalk has no labels or component names of its own.
+Pass ``label_col``/``component_col`` for crosswalks that do; otherwise
+names are learned from the LLM's answers via ``add``. A component learned
+for one product only matches lookups for that same product, since the LLM
+maps it with the product as context. END_USE lookups are a dict access
+instead of a DataFrame merge.
+"""
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+END_USE_PATH = "end_use.csv"
+
+
+def normalize_name(name: str) -> str:
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", str(name).lower()).split())
+
+
+def tokens(name: str) -> frozenset:
+    # Crude singular form so "batteries"/"battery" and "motors"/"motor" meet
+    words = set()
+    for word in normalize_name(name).split():
+        if len(word) > 4 and word.endswith("ies"):
+            word = word[:-3] + "y"
+        elif len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        words.add(word)
+    return frozenset(words)
+
+
+class NAICSIndex:
+    def __init__(self, crosswalk: pd.DataFrame, label_col: Optional[str] = None,
+                 component_col: Optional[str] = None):
+        crosswalk = crosswalk.copy()
+        crosswalk["NAICS_code"] = crosswalk["NAICS_code"].astype(str)
+
+        self.end_uses: Dict[str, List[str]] = defaultdict(list)
+        for code, end_use in crosswalk[["NAICS_code", "END_USE"]].drop_duplicates().itertuples(index=False):
+            self.end_uses[code].append(end_use)
+
+        self._entries: List[Tuple[frozenset, str, str, Optional[str]]] = []  # (tokens, code, label, context)
+        self._exact: Dict[Tuple[Optional[str], str], int] = {}  # (context, name) -> entry id
+        self._postings: Dict[str, set] = defaultdict(set)      # token -> entry ids
+
+        for row in crosswalk.to_dict(orient="records"):
+            label = str(row[label_col]) if label_col else ""
+            if label_col:
+                self.add(label, row["NAICS_code"], label)
+            if component_col and pd.notna(row[component_col]):
+                self.add(row[component_col], row["NAICS_code"], label)
+
+    @classmethod
+    def from_csv(cls, path: str = END_USE_PATH, label_col: Optional[str] = None,
+                 component_col: Optional[str] = None) -> "NAICSIndex":
+        return cls(pd.read_csv(path), label_col, component_col)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, name: str, code: str, label: str, context: Optional[str] = None):
+        """Index ``name`` (a NAICS label or a known component) under ``code``.
+
+        With a ``context`` (the product a component belongs to) the entry
+        only matches lookups made for that same product.
+        """
+        key = normalize_name(name)
+        context = normalize_name(context) if context else None
+        if not key or (context, key) in self._exact:
+            return
+        entry_id = len(self._entries)
+        words = tokens(key)
+        self._entries.append((words, str(code), label, context))
+        self._exact[(context, key)] = entry_id
+        for word in words:
+            self._postings[word].add(entry_id)
+
+    def match(self, name: str, context: Optional[str] = None) -> Optional[Tuple[Dict[str, str], float]]:
+        """Best ``({"NAICS_code", "NAICS_label"}, score)`` for ``name``, or None.
+
+        Only entries without a context, or learned for ``context``, are
+        considered. Exact matches score 1.0; otherwise the score is the Dice
+        coefficient ``2|q & e| / (|q| + |e|)`` of the query's and the entry's
+        tokens, ties going to the earlier entry.
+        """
+        key = normalize_name(name)
+        if not key:
+            return None
+        context = normalize_name(context) if context else None
+        entry_id = self._exact.get((context, key)) if context else None
+        if entry_id is None:
+            entry_id = self._exact.get((None, key))
+        score = 1.0
+        if entry_id is None:
+            query = tokens(key)
+            shared: Dict[int, int] = defaultdict(int)
+            for word in query:
+                for candidate in self._postings.get(word, ()):
+                    if self._entries[candidate][3] in (None, context):
+                        shared[candidate] += 1
+            if not shared:
+                return None
+            scores = {c: 2 * n / (len(query) + len(self._entries[c][0])) for c, n in shared.items()}
+            entry_id = max(scores, key=lambda c: (scores[c], -c))
+            score = scores[entry_id]
+        _, code, label, _ = self._entries[entry_id]
+        return {"NAICS_code": code, "NAICS_label": label}, score
+
+    def end_use(self, code: str) -> List[str]:
+        return self.end_uses.get(str(code), [])
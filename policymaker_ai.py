@@ -1,26 +1,112 @@
 ﻿import os
 import asyncio
-from typing import List, Dict
-from openai import AsyncOpenAI
+import random
+import time
+from contextlib import nullcontext
+from typing import List, Dict, Optional
+from openai import AsyncOpenAI, APITimeoutError, RateLimitError
 
 import json  # we’ll use the standard json module for parsing
 import pandas as pd
 
+from llm_cache import LLMCache, SQLiteLLMCache
+from metrics import LLMMetrics
+from naics_index import NAICSIndex
+
 
 # ─────────────────────────────────────────────────────────────────────────────
 # 1. Configuration (async client)
 # ─────────────────────────────────────────────────────────────────────────────
-API_KEY = 
-client = AsyncOpenAI(api_key=API_KEY)
+API_KEY = os.environ.get("OPENAI_API_KEY")
 LLM_MODEL = "gpt-4o-mini"  # or "gpt-4"/"gpt-4o" if available
+MAX_CONCURRENCY = 8   # concurrent chat requests per pipeline
+MAX_RETRIES = 4       # retries on rate-limit / timeout errors
+RETRY_BASE_DELAY = 1.0
+RETRYABLE_ERRORS = (RateLimitError, APITimeoutError, asyncio.TimeoutError)
+LOCAL_MATCH_THRESHOLD = 0.85  # crosswalk matches scoring below this go to the LLM
+
+
+async def chat_completion(
+    client: AsyncOpenAI,
+    model: str,
+    system_prompt: str,
+    user_prompt: str,
+    cache: Optional[LLMCache] = None,
+    semaphore: Optional[asyncio.Semaphore] = None,
+    metrics: Optional[LLMMetrics] = None,
+    agent: str = "chat"
+) -> str:
+    """
+    Run one temperature-0 chat completion and return the stripped text.
+    Identical prompts are answered from ``cache`` when one is given. At most
+    ``semaphore``'s worth of calls are in flight at once, and rate-limit or
+    timeout errors are retried with exponential backoff plus jitter.
+    ``metrics`` records latency, retries and token usage under ``agent``.
+    """
+    started = time.perf_counter()
+    if cache is not None:
+        cached = cache.get(model, system_prompt, user_prompt)
+        if cached is not None:
+            if metrics is not None:
+                metrics.record_call(agent, time.perf_counter() - started, cached=True)
+            return cached
+
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            async with semaphore or nullcontext():
+                response = await client.chat.completions.create(
+                    model=model,
+                    temperature=0.0,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user",   "content": user_prompt},
+                    ],
+                    timeout=30  # fail if no response in 30s
+                )
+            break
+        except RETRYABLE_ERRORS:
+            if attempt == MAX_RETRIES:
+                raise
+            # Back off outside the semaphore so other calls can use the slot
+            await asyncio.sleep(RETRY_BASE_DELAY * 2 ** attempt + random.uniform(0, RETRY_BASE_DELAY))
+    text = response.choices[0].message.content.strip()
+
+    if metrics is not None:
+        usage = getattr(response, "usage", None)
+        metrics.record_call(
+            agent, time.perf_counter() - started, retries=attempt,
+            prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+            completion_tokens=getattr(usage, "completion_tokens", 0) or 0
+        )
+
+    if cache is not None:
+        cache.set(model, system_prompt, user_prompt, text)
+    return text
+
 
 # ─────────────────────────────────────────────────────────────────────────────
 # 2. Agent A: Component Extractor (async)
 # ─────────────────────────────────────────────────────────────────────────────
 class ComponentExtractorAgent:
-    def __init__(self, client: AsyncOpenAI, model: str = LLM_MODEL):
+    agent = "component_extractor"
+
+    def __init__(
+        self,
+        client: AsyncOpenAI,
+        model: str = LLM_MODEL,
+        cache: Optional[LLMCache] = None,
+        semaphore: Optional[asyncio.Semaphore] = None,
+        metrics: Optional[LLMMetrics] = None
+    ):
         self.client = client
         self.model = model
+        self.cache = cache
+        self.semaphore = semaphore
+        self.metrics = metrics
+
+    def _record_parse(self, fallback: bool):
+        if self.metrics is not None:
+            self.metrics.record_parse(self.agent, fallback)
 
     async def extract_components(self, product_name: str) -> List[str]:
         system_prompt = (
@@ -31,29 +117,23 @@ class ComponentExtractorAgent:
         )
         user_prompt = f"Decompose this product into its main components and include product name and component: \"{product_name}\"."
 
-        # (1) Ask the LLM for a JSON array of components
-        response = await self.client.chat.completions.create(
-            model=self.model,
-            temperature=0.0,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user",   "content": user_prompt},
-            ],
-            timeout=30  # fail if no response in 30s
+        # (1) Ask the LLM for a JSON array of components, (2) extract the raw string
+        text = await chat_completion(
+            self.client, self.model, system_prompt, user_prompt, self.cache, self.semaphore,
+            self.metrics, self.agent
         )
 
-        # (2) Extract the raw string
-        text = response.choices[0].message.content.strip()
-
         # (3) Attempt to parse as JSON
         try:
             components = json.loads(text)
             if isinstance(components, list) and all(isinstance(item, str) for item in components):
+                self._record_parse(fallback=False)
                 return components
             else:
                 raise ValueError("LLM returned JSON, but not a list of strings.")
         except Exception:
             # Fallback: split by lines and strip bullets
+            self._record_parse(fallback=True)
             lines = [line.strip("-• ").strip() for line in text.splitlines() if line.strip()]
             return lines
 
@@ -62,9 +142,25 @@ class ComponentExtractorAgent:
 # 3. Agent B: NAICS Mapper (async)
 # ─────────────────────────────────────────────────────────────────────────────
 class NAICSMapperAgent:
-    def __init__(self, client: AsyncOpenAI, model: str = LLM_MODEL):
+    agent = "naics_mapper"
+
+    def __init__(
+        self,
+        client: AsyncOpenAI,
+        model: str = LLM_MODEL,
+        cache: Optional[LLMCache] = None,
+        semaphore: Optional[asyncio.Semaphore] = None,
+        metrics: Optional[LLMMetrics] = None
+    ):
         self.client = client
         self.model = model
+        self.cache = cache
+        self.semaphore = semaphore
+        self.metrics = metrics
+
+    def _record_parse(self, fallback: bool):
+        if self.metrics is not None:
+            self.metrics.record_parse(self.agent, fallback)
 
     async def map_to_naics(
         self,
@@ -92,19 +188,11 @@ class NAICSMapperAgent:
             "Return exactly: {\"NAICS_code\":\"...\",\"NAICS_label\":\"...\"}"
         )
 
-        response = await self.client.chat.completions.create(
-            model=self.model,
-            temperature=0.0,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user",   "content": user_prompt},
-            ],
-            timeout=30
+        text = await chat_completion(
+            self.client, self.model, system_prompt, user_prompt, self.cache, self.semaphore,
+            self.metrics, self.agent
         )
 
-        text = response.choices[0].message.content.strip()
-      
-
         # 1) Try strict JSON parse
         try:
             naics_obj = json.loads(text)
@@ -113,6 +201,7 @@ class NAICSMapperAgent:
                 and "NAICS_code" in naics_obj
                 and "NAICS_label" in naics_obj
             ):
+                self._record_parse(fallback=False)
                 return {
                     "NAICS_code": str(naics_obj["NAICS_code"]),
                     "NAICS_label": str(naics_obj["NAICS_label"])
@@ -121,6 +210,7 @@ class NAICSMapperAgent:
             raise ValueError("Missing required keys in parsed JSON")
         except Exception:
             # 2) Fallback: scan line-by-line for the exact keys
+            self._record_parse(fallback=True)
             code = None
             label = None
             for line in text.splitlines():
@@ -143,52 +233,110 @@ class NAICSMapperAgent:
 # 4. Orchestrator (async)
 # ─────────────────────────────────────────────────────────────────────────────
 class ProductToNAICSPipeline:
-    def __init__(self, client: AsyncOpenAI):
-        self.extractor = ComponentExtractorAgent(client)
-        self.mapper    = NAICSMapperAgent(client)
+    def __init__(
+        self,
+        client: AsyncOpenAI,
+        cache: Optional[LLMCache] = None,
+        max_concurrency: int = MAX_CONCURRENCY,
+        naics_index: Optional[NAICSIndex] = None,
+        match_threshold: float = LOCAL_MATCH_THRESHOLD,
+        metrics: Optional[LLMMetrics] = None
+    ):
+        # One semaphore shared by both agents bounds all in-flight chat calls
+        semaphore = asyncio.Semaphore(max_concurrency)
+        self.extractor = ComponentExtractorAgent(client, cache=cache, semaphore=semaphore, metrics=metrics)
+        self.mapper    = NAICSMapperAgent(client, cache=cache, semaphore=semaphore, metrics=metrics)
+        self.naics_index = naics_index
+        self.match_threshold = match_threshold
+
+    async def map_component(self, product_name: str, component_name: str,
+                            learned: Optional[list] = None) -> Dict[str, str]:
+        # Answer from the local crosswalk when it is confident, else ask the LLM
+        if self.naics_index is not None:
+            match = self.naics_index.match(component_name, context=product_name)
+            if match is not None and match[1] >= self.match_threshold:
+                return match[0]
+        result = await self.mapper.map_to_naics(product_name, component_name)
+        if result.get("NAICS_code", "UNKNOWN") != "UNKNOWN":
+            entry = (product_name, component_name, result)
+            if learned is None:
+                self._learn([entry])
+            else:
+                learned.append(entry)
+        return result
+
+    def _learn(self, entries: list):
+        # Add LLM answers to the index; a component is only reused for the same product
+        if self.naics_index is None:
+            return
+        for product_name, component_name, result in entries:
+            code, label = result["NAICS_code"], result["NAICS_label"]
+            self.naics_index.add(component_name, code, label, context=product_name)
+            if label != "UNKNOWN":
+                self.naics_index.add(label, code, label)
 
-    async def lookup_product(self, product_name: str) -> Dict[str, Dict[str, str]]:
+    async def lookup_product(self, product_name: str, learned: Optional[list] = None) -> Dict[str, Dict[str, str]]:
         # 1) Decompose the product
         components = await self.extractor.extract_components(product_name)
         print(f"→ Components found: {components}")
 
-        results: Dict[str, Dict[str, str]] = {}
-        # 2) For each component, include the product context when mapping
-        for comp in components:
-            naics_info = await self.mapper.map_to_naics(product_name, comp)
-            results[comp] = naics_info
+        # 2) Map every distinct component concurrently, with the product as context.
+        # New index entries are held back until all mappings finish, so the
+        # result does not depend on which concurrent call returned first.
+        pending = [] if learned is None else learned
+        unique_components = list(dict.fromkeys(components))
+        mappings = await asyncio.gather(
+            *(self.map_component(product_name, comp, pending) for comp in unique_components)
+        )
+        if learned is None:
+            self._learn(pending)
 
+        # Keep the extractor's component order in the result
+        results: Dict[str, Dict[str, str]] = dict(zip(unique_components, mappings))
         return results
 
+    async def lookup_products(self, product_names: List[str]) -> Dict[str, Dict[str, Dict[str, str]]]:
+        """
+        Look up many products at once. All component mappings share the
+        pipeline's concurrency limit; results keep the input order. The
+        index only learns from this batch once every lookup has finished.
+        """
+        unique_products = list(dict.fromkeys(product_names))
+        learned: list = []
+        lookups = await asyncio.gather(*(self.lookup_product(name, learned) for name in unique_products))
+        self._learn(learned)
+        return dict(zip(unique_products, lookups))
+
 
 
 # ─────────────────────────────────────────────────────────────────────────────
 # 5. Async main entrypoint
 # ─────────────────────────────────────────────────────────────────────────────
 async def main():
+    # chat_completion owns retries and backoff, so the SDK must not retry as well
+    client = AsyncOpenAI(api_key=API_KEY, max_retries=0)
+    cache = SQLiteLLMCache()
+    naics_index = NAICSIndex.from_csv('end_use.csv')
+    metrics = LLMMetrics()
+    pipeline = ProductToNAICSPipeline(client, cache=cache, naics_index=naics_index, metrics=metrics)
     while True:
-        pipeline = ProductToNAICSPipeline(client)
-
         product_name = input("Enter a product name: ").strip()
         if product_name == 'quit':
-            exit
+            break
         print(f"\nDecomposing \"{product_name}\" and mapping each component to NAICS:\n")
 
         mapping = await pipeline.lookup_product(product_name)
-    
-        cw = pd.read_csv('end_use.csv')
-        cw['NAICS_code'] = cw['NAICS_code'].astype(str)
-        components = pd.DataFrame.from_dict(mapping, orient='index').reset_index().rename(columns={'index': 'component'})
-        components['NAICS_code'] = components['NAICS_code'].astype(str)
-        
-        components = components.merge(cw, on='NAICS_code')
-
-        components = components[['NAICS_label','component', 'END_USE']]
-        print(components)
-    
 
+        rows = [
+            {'NAICS_label': naics['NAICS_label'], 'component': component, 'END_USE': end_use}
+            for component, naics in mapping.items()
+            for end_use in naics_index.end_use(naics['NAICS_code'])
+        ]
+        components = pd.DataFrame(rows, columns=['NAICS_label', 'component', 'END_USE'])
+        print(components)
+        print(f"LLM cache: {cache.stats()}")
+        print(f"LLM calls: {metrics.summary()}")
 
-    
 
 if __name__ == "__main__":
     asyncio.run(main()) 
\ No newline at end of file
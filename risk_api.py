@@ -1,111 +1,319 @@
-from fastapi import FastAPI
-import pandas as pd
-from sklearn.preprocessing import MinMaxScaler
+import gc
+import json
+import logging
+import os
+import threading
+import time
+from typing import List, Optional
+
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+from pydantic import BaseModel, Field
+
+from metrics import CONTENT_TYPE, REGISTRY
+from risk_engine import RiskCube, RiskEngine, parse_weights
+from risk_pipeline import SNAPSHOT_DIR, build_snapshot, current_generation, latest_version, load_engine
+from risk_responses import ResponseStore, etag_matches
+from risk_sensitivity import SensitivityBands
 
 app = FastAPI(title="Supply Chain Risk API")
+logger = logging.getLogger(__name__)
+WATCH_SECONDS = float(os.environ.get("RISK_API_WATCH_SECONDS", "5"))
+
+# --- Metrics ---
+REQUEST_SECONDS = REGISTRY.histogram("risk_api_request_seconds", "Request latency by route.",
+                                     ["method", "route", "status"])
+SNAPSHOT_INFO = REGISTRY.gauge("risk_snapshot_info", "Snapshot version being served.", ["version"])
+SNAPSHOT_ROWS = REGISTRY.gauge("risk_snapshot_rows", "Rows in the served snapshot.")
+SNAPSHOT_LOAD_SECONDS = REGISTRY.gauge("risk_snapshot_load_seconds", "Time to map the served snapshot.")
+SNAPSHOT_SWAPS = REGISTRY.counter("risk_snapshot_swaps_total", "Snapshot swaps since start.")
+STAGE_SECONDS = REGISTRY.gauge("risk_pipeline_stage_seconds",
+                               "Pipeline stage timings recorded when the served snapshot was built.", ["stage"])
+STAGE_ROWS = REGISTRY.gauge("risk_pipeline_rows",
+                            "Rows left after each pipeline step of the served snapshot.", ["stage"])
+
+# --- Served Table ---
+class RiskTable:
+    """Everything one snapshot version needs to answer requests.
+
+    The engine keeps rows ranked by default-weight risk inside each
+    (Commodity, Year) group, so the endpoints answer with a lookup and a
+    slice; custom weights rescore only the requested group. The engine
+    arrays are memory-mapped from the snapshot, so uvicorn workers share
+    one read-only copy instead of each holding their own. The cube answers
+    multi-year queries, and default-weight listings are served from
+    pre-serialized bytes.
+    """
+
+    def __init__(self, engine: RiskEngine, cube: RiskCube, manifest: dict):
+        self.manifest = manifest
+        self.engine = engine
+        self.cube = cube
+        self.directory = os.path.join(SNAPSHOT_DIR, manifest["version"])
+        self.responses = ResponseStore.load(engine, self.directory, manifest["version"])
+        self._sensitivity = None
+
+    def sensitivity(self) -> Optional[SensitivityBands]:
+        # Bands are computed after publishing (risk_sensitivity.py), so look
+        # for them until they appear
+        if self._sensitivity is None:
+            self._sensitivity = SensitivityBands.load(self.directory, self.engine)
+        return self._sensitivity
+
+    def ranked(self, commodity: str, year: int, weights=None, top_n: Optional[int] = None):
+        if weights is None:
+            return self.engine.ranked((commodity, year), top_n)
+        return self.engine.group_risk((commodity, year), weights, top_n)
+
+
+def resident_memory() -> dict:
+    usage = {}
+    try:
+        with open("/proc/self/statm") as f:
+            usage["rss_bytes"] = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        # ru_maxrss is KiB on Linux
+        usage["peak_rss_bytes"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except ImportError:
+        pass
+    return usage
+
+
+# --- Load Snapshot ---
+# The pipeline itself runs offline (`python risk_pipeline.py build`); startup
+# only maps the prebuilt table. Set RISK_API_REBUILD=1 to rebuild first (with
+# several workers, run the build once beforehand instead).
+if os.environ.get("RISK_API_REBUILD") == "1":
+    build_snapshot(SNAPSHOT_DIR)
+
+
+def open_table() -> RiskTable:
+    started = time.perf_counter()
+    table = RiskTable(*load_engine(SNAPSHOT_DIR))
+    SNAPSHOT_LOAD_SECONDS.set(round(time.perf_counter() - started, 4))
+    SNAPSHOT_ROWS.set(table.manifest["rows"])
+    SNAPSHOT_INFO.clear()
+    SNAPSHOT_INFO.set(1, version=table.manifest["version"])
+    stages = table.manifest.get("stages", {})
+    for gauge, values in ((STAGE_SECONDS, stages.get("seconds", {})), (STAGE_ROWS, stages.get("rows", {}))):
+        gauge.clear()
+        for stage, value in values.items():
+            gauge.set(value, stage=stage)
+    return table
+
+
+risk_table = open_table()
+reload_lock = threading.Lock()
+
+
+def swap_to_latest() -> RiskTable:
+    """Serve the LATEST snapshot; in-flight requests keep the table they hold."""
+    global risk_table
+    with reload_lock:
+        if latest_version(SNAPSHOT_DIR) != risk_table.manifest["version"]:
+            risk_table = open_table()
+            SNAPSHOT_SWAPS.inc()
+            gc.collect()
+        return risk_table
+
+
+def watch_generation():
+    # Each worker polls the publish counter and swaps itself; no restart needed
+    seen = current_generation(SNAPSHOT_DIR)
+    while True:
+        time.sleep(WATCH_SECONDS)
+        try:
+            generation = current_generation(SNAPSHOT_DIR)
+            if generation != seen:
+                swap_to_latest()
+                seen = generation
+        except Exception:
+            logger.exception("Snapshot swap failed; still serving %s", risk_table.manifest["version"])
+
+
+if WATCH_SECONDS > 0:
+    threading.Thread(target=watch_generation, name="snapshot-watch", daemon=True).start()
+
+
+def resolve_weights(weights: Optional[str]):
+    if weights is None:
+        return None
+    try:
+        return parse_weights(weights)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+def ranked_countries(commodity: str, year: int, weights=None, top_n: Optional[int] = None):
+    return risk_table.ranked(commodity, year, weights, top_n)
+
+
+def listing_response(request: Request, commodity: str, year: int, top_n: Optional[int] = None):
+    """Pre-serialized default-weight listing with a strong ETag; 304 when the client has it."""
+    accept_gzip = "gzip" in request.headers.get("accept-encoding", "")
+    listing = risk_table.responses.listing(commodity, year, top_n, accept_gzip)
+    if listing is None:
+        return None
+    body, etag, encoding = listing
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(body, media_type="application/json", headers=headers)
+
+
+# --- Request Models ---
+class RiskQuery(BaseModel):
+    commodity: str
+    year: int
+    top_n: Optional[int] = None
+
+
+class BatchRiskRequest(BaseModel):
+    queries: List[RiskQuery] = Field(..., max_length=5000)
+    weights: Optional[str] = None
+
+
+def risk_result(query: RiskQuery, weights=None) -> dict:
+    ranked = ranked_countries(query.commodity, query.year, weights, query.top_n)
+    if ranked is None:
+        return {"commodity": query.commodity, "year": query.year,
+                "error": "No data found for selected parameters."}
+    if query.top_n is None:
+        return {"commodity": query.commodity, "year": query.year, "all_countries": ranked}
+    return {"commodity": query.commodity, "year": query.year, "top_risks": ranked}
 
-# --- Load Data ---
-imports_df = pd.read_csv(r"https://drive.google.com/uc?export=download&id=1nuueoWFkfPRDJjgWtYcfJj0ffoIryvGp")
-lpi_df = pd.read_csv(r"https://drive.google.com/uc?export=download&id=1GlWo2ybad5FhIGnfUkSiQoy792lZIntd")
-wgi_df = pd.read_excel(r"https://drive.google.com/uc?export=download&id=11VGF7ldEfBhMd7XQ78q8sNpe-1Nj6kLU")
-consumption_df = pd.read_csv(r"https://drive.google.com/uc?export=download&id=12HzcsHI4Y3hcWafDqobdoNNd8C0heMYC")
-
-
-# --- Clean and Prepare WGI ---
-wgi_df_cleaned = wgi_df[wgi_df["estimate"] != ".."].copy()
-wgi_df_cleaned["estimate"] = pd.to_numeric(wgi_df_cleaned["estimate"], errors="coerce")
-wgi_pivot = wgi_df_cleaned.pivot_table(
-    index=["countryname", "year"],
-    columns="indicator",
-    values="estimate"
-).reset_index()
-wgi_pivot.columns.name = None
-wgi_pivot = wgi_pivot.rename(columns={
-    "countryname": "Country", "year": "Year",
-    "cc": "WGI_ControlOfCorruption", "ge": "WGI_GovtEffectiveness",
-    "rl": "WGI_RuleOfLaw", "rq": "WGI_RegulatoryQuality",
-    "va": "WGI_VoiceAccountability", "pv": "WGI_PoliticalStability"
-})
-
-# --- Clean Other Data Sources ---
-lpi_clean = lpi_df[["Country", "Year", "LPI_Score_Interpolated"]].rename(columns={"LPI_Score_Interpolated": "LPI_Score"})
-imports_clean = imports_df[imports_df["Country"] != "World Total"].copy()
-consumption_clean = consumption_df.rename(columns={
-    "Year": "ConsumptionYear", "Commodity type": "Commodity",
-    "Overall consumption percentage": "ConsumptionPercentage"
-})
-
-# --- Merge All ---
-merged = imports_clean.merge(lpi_clean, on=["Country", "Year"], how="left")
-merged = merged.merge(wgi_pivot, on=["Country", "Year"], how="left")
-merged = merged.merge(consumption_clean[["ConsumptionYear", "Commodity", "ConsumptionPercentage"]],
-                      left_on=["Year", "Commodity"],
-                      right_on=["ConsumptionYear", "Commodity"],
-                      how="left")
-
-# --- Filter Valid Rows ---
-required_cols = [
-    "ImportValueUSD", "LPI_Score",
-    "WGI_ControlOfCorruption", "WGI_GovtEffectiveness", "WGI_PoliticalStability",
-    "WGI_RuleOfLaw", "WGI_RegulatoryQuality", "WGI_VoiceAccountability"
-]
-filtered_df = merged.dropna(subset=required_cols).copy()
-
-# --- Normalize Inputs ---
-scaler = MinMaxScaler()
-filtered_df["Norm_Imports"] = scaler.fit_transform(filtered_df[["ImportValueUSD"]])
-filtered_df["Norm_LPI"] = 1 - scaler.fit_transform(filtered_df[["LPI_Score"]])
-filtered_df["Norm_Consumption"] = scaler.fit_transform(filtered_df[["ConsumptionPercentage"]].fillna(0))
-
-wgi_cols = [
-    "WGI_ControlOfCorruption", "WGI_GovtEffectiveness", "WGI_PoliticalStability",
-    "WGI_RuleOfLaw", "WGI_RegulatoryQuality", "WGI_VoiceAccountability"
-]
-for col in wgi_cols:
-    filtered_df[f"Norm_{col}"] = 1 - scaler.fit_transform(filtered_df[[col]])
-
-# --- Base Risk Score ---
-filtered_df["BaseRiskScore"] = (
-    filtered_df["Norm_Imports"] * 0.3 +
-    filtered_df["Norm_Consumption"] * 0.2 +
-    filtered_df["Norm_LPI"] * 0.1 +
-    filtered_df[[f"Norm_{col}" for col in wgi_cols]].mean(axis=1) * 0.4
-)
-
-# --- Adjust by Market Share ---
-filtered_df["CountryCommodityShare"] = (
-    filtered_df.groupby(["Commodity", "Year"])["ImportValueUSD"]
-    .transform(lambda x: x / x.sum())
-)
-filtered_df["AdjustedRiskScore"] = filtered_df["BaseRiskScore"] * filtered_df["CountryCommodityShare"]
-filtered_df["RiskPercentage"] = (
-    filtered_df.groupby(["Commodity", "Year"])["AdjustedRiskScore"]
-    .transform(lambda x: x / x.sum()) * 100
-).round(2)
-
-# --- Final Output ---
-final_df = filtered_df[["Country", "Year", "Commodity", "RiskPercentage"]]
 
 # --- API Endpoints ---
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    # Label by route template, not raw path, to keep the series bounded
+    route = getattr(request.scope.get("route"), "path", "unmatched")
+    REQUEST_SECONDS.observe(time.perf_counter() - started, method=request.method,
+                            route=route, status=response.status_code)
+    return response
+
 @app.get("/top-risk-countries/")
-def get_top_risks(commodity: str, year: int, top_n: int = 3):
-    subset = final_df[(final_df["Commodity"] == commodity) & (final_df["Year"] == year)]
-    if subset.empty:
+def get_top_risks(request: Request, commodity: str, year: int, top_n: int = 3, weights: Optional[str] = None):
+    if weights is None:
+        response = listing_response(request, commodity, year, top_n)
+        if response is None:
+            return {"error": "No data found for selected parameters."}
+        return response
+    ranked = ranked_countries(commodity, year, resolve_weights(weights), top_n)
+    if ranked is None:
         return {"error": "No data found for selected parameters."}
-    top_risks = subset.sort_values(by="RiskPercentage", ascending=False).head(top_n)
     return {
         "commodity": commodity,
         "year": year,
-        "top_risks": top_risks[["Country", "RiskPercentage"]].to_dict(orient="records")
+        "top_risks": ranked
     }
 
 @app.get("/risk-score/")
-def get_risk_for_all(commodity: str, year: int):
-    subset = final_df[(final_df["Commodity"] == commodity) & (final_df["Year"] == year)]
-    if subset.empty:
+def get_risk_for_all(request: Request, commodity: str, year: int, weights: Optional[str] = None):
+    if weights is None:
+        response = listing_response(request, commodity, year)
+        if response is None:
+            return {"error": "No data found for selected parameters."}
+        return response
+    ranked = ranked_countries(commodity, year, resolve_weights(weights))
+    if ranked is None:
         return {"error": "No data found for selected parameters."}
     return {
         "commodity": commodity,
         "year": year,
-        "all_countries": subset.sort_values(by="RiskPercentage", ascending=False)[["Country", "RiskPercentage"]].to_dict(orient="records")
+        "all_countries": ranked
+    }
+
+@app.post("/risk-scores/batch")
+def get_risk_batch(request: BatchRiskRequest):
+    weights = resolve_weights(request.weights)
+    return {"results": [risk_result(query, weights) for query in request.queries]}
+
+@app.post("/risk-scores/stream")
+def stream_risk_batch(request: BatchRiskRequest):
+    weights = resolve_weights(request.weights)
+    def ndjson():
+        for query in request.queries:
+            yield json.dumps(risk_result(query, weights)) + "\n"
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+@app.get("/risk-trend/")
+def get_risk_trend(commodity: str, start_year: Optional[int] = None, end_year: Optional[int] = None,
+                   countries: Optional[str] = None):
+    """Default-weight risk per year for one commodity; ``countries`` is comma-separated."""
+    names = [c.strip() for c in countries.split(",") if c.strip()] if countries else None
+    trend = risk_table.cube.trend(commodity, start_year, end_year, names)
+    if trend is None:
+        return {"error": "No data found for selected parameters."}
+    return {"commodity": commodity, **trend}
+
+@app.get("/country-profile/")
+def get_country_profile(country: str, start_year: Optional[int] = None, end_year: Optional[int] = None):
+    profile = risk_table.cube.country_profile(country, start_year, end_year)
+    if profile is None:
+        return {"error": "No data found for selected parameters."}
+    return {"country": country, **profile}
+
+@app.get("/risk-sensitivity/")
+def get_risk_sensitivity(commodity: str, year: int, top_n: Optional[int] = None):
+    """Rank and RiskPercentage bands under sampled weights; ``top_n`` limits the countries listed."""
+    table = risk_table
+    bands = table.sensitivity()
+    if bands is None:
+        raise HTTPException(status_code=404, detail=(
+            f"No sensitivity bands for snapshot {table.manifest['version']}; "
+            "run `python risk_sensitivity.py`."))
+    rows = table.engine.group_slice((commodity, year))
+    if rows is None:
+        return {"error": "No data found for selected parameters."}
+    return {
+        "commodity": commodity,
+        "year": year,
+        "samples": bands.params["samples"],
+        "concentration": bands.params["concentration"],
+        "probability_top_n": bands.params["top_n"],
+        "countries": bands.records(table.engine, rows, top_n),
+    }
+
+@app.get("/snapshot/")
+def get_snapshot():
+    return risk_table.manifest
+
+@app.post("/admin/reload")
+def reload_snapshot(x_admin_token: Optional[str] = Header(None)):
+    """Swap in the LATEST snapshot without dropping in-flight requests."""
+    admin_token = os.environ.get("RISK_API_ADMIN_TOKEN")
+    if admin_token and x_admin_token != admin_token:
+        raise HTTPException(status_code=403, detail="Invalid admin token.")
+    table = swap_to_latest()
+    return {
+        "version": table.manifest["version"],
+        "rows": table.manifest["rows"],
+        "parent": table.manifest.get("parent"),
+        "renormalized": table.manifest.get("renormalized", False),
+    }
+
+@app.get("/metrics")
+def get_metrics():
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+@app.get("/debug/memory")
+def get_memory_report():
+    table = risk_table
+    engine_bytes = table.engine.memory_usage()
+    engine_bytes["cube"] = table.cube.memory_usage()["values"]
+    return {
+        "version": table.manifest["version"],
+        "rows": table.manifest["rows"],
+        "groups": len(table.engine.group_keys),
+        "served_table_bytes": sum(engine_bytes.values()),
+        "served_table": engine_bytes,
+        "process": resident_memory(),
     }
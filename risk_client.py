@@ -0,0 +1,111 @@
+"""HTTP client for the risk API, shared by every Streamlit session.
+
+One pooled ``requests.Session`` with keep-alive, timeouts and retries on
+gateway errors, plus a TTL cache of API responses; expired listings are
+revalidated with their ETag, so an unchanged snapshot costs a 304.
+``Streamlit.py`` wraps a single instance in ``st.cache_resource`` so all
+sessions share the pool and the cache. ``prefetch`` fills the cache for several years of a commodity in
+the background with one batch request.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+CACHE_TTL = 600           # seconds a risk response stays fresh
+REQUEST_TIMEOUT = (3.05, 30)  # (connect, read) seconds
+POOL_SIZE = 10
+
+
+class RiskAPIClient:
+    def __init__(self, base_url: str, ttl: float = CACHE_TTL, pool_size: int = POOL_SIZE):
+        self.base_url = base_url.rstrip("/")
+        self.ttl = ttl
+        self.session = requests.Session()
+        retries = Retry(total=2, backoff_factor=0.5, status_forcelist=(502, 503, 504),
+                        allowed_methods=None)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retries)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._cache: Dict[Tuple[str, int], Tuple[float, dict, Optional[str]]] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="risk-prefetch")
+        self._prefetching = set()
+
+    # --- Cache ---
+    def _cached(self, commodity: str, year: int) -> Optional[dict]:
+        with self._lock:
+            entry = self._cache.get((commodity, year))
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[1]
+
+    def _store(self, payload: dict, etag: Optional[str] = None):
+        with self._lock:
+            key = (payload["commodity"], int(payload["year"]))
+            self._cache[key] = (time.monotonic() + self.ttl, payload, etag)
+
+    # --- Requests ---
+    def risk_scores(self, commodity: str, year: int) -> Optional[dict]:
+        """Full ``/risk-score/`` listing, or None if the API has no data."""
+        data = self._cached(commodity, year)
+        if data is not None:
+            return data
+        with self._lock:
+            _, stale, etag = self._cache.get((commodity, year), (None, None, None))
+        headers = {"If-None-Match": etag} if etag else {}
+        response = self.session.get(f"{self.base_url}/risk-score/", params={"commodity": commodity, "year": year},
+                                    headers=headers, timeout=REQUEST_TIMEOUT)
+        if response.status_code == 304:
+            self._store(stale, etag)
+            return stale
+        if response.status_code != 200:
+            return None
+        data = response.json()
+        if "error" in data:
+            return None
+        self._store(data, response.headers.get("ETag"))
+        return data
+
+    def top_risks(self, commodity: str, year: int, top_n: int) -> Optional[dict]:
+        """``/top-risk-countries/`` payload, cut from the cached full listing."""
+        data = self.risk_scores(commodity, year)
+        if data is None:
+            return None
+        return {"commodity": commodity, "year": year, "top_risks": data["all_countries"][:top_n]}
+
+    # --- Prefetch ---
+    def prefetch(self, commodity: str, years: Iterable[int]):
+        """Fetch the full listing for every missing year in the background."""
+        missing = [year for year in years if self._cached(commodity, year) is None]
+        with self._lock:
+            missing = [year for year in missing if (commodity, year) not in self._prefetching]
+            self._prefetching.update((commodity, year) for year in missing)
+        if missing:
+            self._executor.submit(self._prefetch, commodity, missing)
+
+    def _prefetch(self, commodity: str, years: list):
+        try:
+            response = self.session.post(
+                f"{self.base_url}/risk-scores/batch",
+                json={"queries": [{"commodity": commodity, "year": year} for year in years]},
+                timeout=REQUEST_TIMEOUT,
+            )
+            if response.status_code == 200:
+                for result in response.json()["results"]:
+                    if "error" not in result:
+                        self._store(result)
+            else:
+                # Older API without the batch endpoint: one request per year
+                for year in years:
+                    self.risk_scores(commodity, year)
+        except requests.RequestException:
+            pass
+        finally:
+            with self._lock:
+                self._prefetching.difference_update((commodity, year) for year in years)
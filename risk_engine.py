@@ -0,0 +1,347 @@
+"""Vectorized risk scoring over the normalized feature columns.
+
+Rows are kept sorted by (Commodity, Year) so every group is a contiguous
+slice; grouped sums are ``np.add.reduceat`` over the group offsets instead
+of a Python lambda per group. Within each group rows are ordered by
+default-weight risk, highest first, so a top-N query is a slice.
+
+Only the serving columns are kept, in compact form: Country and Commodity
+as categorical codes, Year as int16, and float32 values. ``write_arrow``
+stores those arrays as Arrow IPC files that ``from_arrow`` memory-maps
+read-only, so every API worker shares one copy through the page cache.
+
+``RiskCube`` lays the default-weight scores out as a dense
+country x commodity x year array for trend and profile queries.
+"""
+import json
+import os
+import sys
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+# --- Weights ---
+FEATURES = ["imports", "consumption", "lpi", "wgi"]
+feature_cols = ["Norm_Imports", "Norm_Consumption", "Norm_LPI", "Norm_WGI"]
+DEFAULT_WEIGHTS = np.array([0.3, 0.2, 0.1, 0.4])
+
+
+def parse_weights(weights) -> np.ndarray:
+    """Parse custom weights for the imports/consumption/LPI/WGI blend.
+
+    Accepts ``"0.3,0.2,0.1,0.4"`` (all four, in that order), named pairs such
+    as ``"imports=0.5,wgi=0.5"`` (unnamed features get 0), a dict, or a
+    sequence of four numbers. Raises ``ValueError`` on anything else.
+    """
+    if weights is None:
+        return DEFAULT_WEIGHTS
+    if isinstance(weights, str):
+        parts = [part.strip() for part in weights.split(",") if part.strip()]
+        if parts and all("=" in part for part in parts):
+            weights = dict(part.split("=", 1) for part in parts)
+        else:
+            weights = parts
+    if isinstance(weights, dict):
+        unknown = set(weights) - set(FEATURES)
+        if unknown:
+            raise ValueError(f"Unknown weight names: {sorted(unknown)}; expected {FEATURES}")
+        weights = [weights.get(name, 0) for name in FEATURES]
+    try:
+        vector = np.array([float(w) for w in weights], dtype=np.float64)
+    except (TypeError, ValueError):
+        raise ValueError(f"Weights must be numbers, got {weights!r}")
+    if vector.shape != (len(FEATURES),):
+        raise ValueError(f"Expected {len(FEATURES)} weights ({', '.join(FEATURES)}), got {len(vector)}")
+    if not np.all(np.isfinite(vector)) or np.any(vector < 0) or vector.sum() == 0:
+        raise ValueError("Weights must be finite, non-negative and not all zero.")
+    return vector
+
+
+def _group_sum(values: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    if not len(values):
+        return values
+    return np.add.reduceat(values, offsets[:-1])
+
+
+def _percentage(adjusted: np.ndarray, totals: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.round(adjusted / totals * 100, 2)
+
+
+def _column(table: pa.Table, name: str) -> pa.Array:
+    chunked = table.column(name)
+    if chunked.num_chunks == 1:
+        return chunked.chunk(0)
+    return pa.concat_arrays(chunked.chunks) if chunked.num_chunks else pa.array([], type=chunked.type)
+
+
+def write_ipc(table: pa.Table, path: str):
+    tmp_path = f"{path}.tmp"
+    with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(tmp_path, path)
+
+
+def read_ipc(path: str) -> pa.Table:
+    # Buffers point into the mapped file; numpy views on them copy nothing
+    return pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+
+
+# --- Engine ---
+ROWS_FILE = "served_rows.arrow"
+GROUPS_FILE = "served_groups.arrow"
+
+
+class RiskEngine:
+    def __init__(self, features_df: pd.DataFrame):
+        countries = pd.Categorical(features_df["Country"])
+        commodities = pd.Categorical(features_df["Commodity"])
+
+        country_codes = countries.codes.astype(np.int32)
+        commodity_codes = commodities.codes.astype(np.int32)
+        years = features_df["Year"].to_numpy(dtype=np.int16)
+        features = features_df[feature_cols].to_numpy(dtype=np.float64)
+        imports = features_df["ImportValueUSD"].to_numpy(dtype=np.float64)
+
+        # 1. Sort by (Commodity, Year) and find the group boundaries
+        order = np.lexsort((years, commodity_codes))
+        commodity_codes, years = commodity_codes[order], years[order]
+        if len(order):
+            changed = (commodity_codes[1:] != commodity_codes[:-1]) | (years[1:] != years[:-1])
+            starts = np.concatenate([[0], np.flatnonzero(changed) + 1])
+        else:
+            starts = np.zeros(0, dtype=np.int64)
+        offsets = np.append(starts, len(order)).astype(np.int64)
+        group_ids = np.repeat(np.arange(len(starts), dtype=np.int32), np.diff(offsets))
+
+        # 2. Default-weight scores in float64, then rank rows inside each group
+        features, imports = features[order], imports[order]
+        share = imports / _group_sum(imports, offsets)[group_ids]
+        adjusted = (features @ DEFAULT_WEIGHTS) * share
+        risk = _percentage(adjusted, _group_sum(adjusted, offsets)[group_ids])
+        ranked = np.lexsort((-np.nan_to_num(risk, nan=-np.inf), group_ids))
+
+        self._attach(
+            country_names=np.asarray(countries.categories, dtype=object),
+            commodity_names=np.asarray(commodities.categories, dtype=object),
+            offsets=offsets,
+            group_commodity=commodity_codes[starts],
+            group_year=years[starts],
+            country_codes=country_codes[order][ranked],
+            features=features[ranked].astype(np.float32),
+            share=share[ranked].astype(np.float32),
+            risk=risk[ranked].astype(np.float32),
+        )
+
+    def _attach(self, country_names, commodity_names, offsets, group_commodity, group_year,
+                country_codes, features, share, risk):
+        self.country_names = country_names
+        self.commodity_names = commodity_names
+        self.offsets = offsets
+        self.group_ids = np.repeat(np.arange(len(offsets) - 1, dtype=np.int32), np.diff(offsets))
+        self.group_commodity = group_commodity
+        self.group_year = group_year
+        self.group_keys = [(commodity_names[c], int(y)) for c, y in zip(group_commodity, group_year)]
+        self.group_lookup = {key: gid for gid, key in enumerate(self.group_keys)}
+        self.country_codes = country_codes
+        self.features = features
+        self.share = share
+        self.risk = risk
+
+    # --- Arrow IPC ---
+    def write_arrow(self, directory: str):
+        rows = pa.table({
+            "country_code": self.country_codes,
+            "features": pa.FixedSizeListArray.from_arrays(pa.array(self.features.ravel()), len(feature_cols)),
+            "share": self.share,
+            "risk": self.risk,
+        }).replace_schema_metadata({
+            "country_names": json.dumps(self.country_names.tolist()),
+            "commodity_names": json.dumps(self.commodity_names.tolist()),
+        })
+        groups = pa.table({
+            "commodity_code": self.group_commodity,
+            "year": self.group_year,
+            "start": self.offsets[:-1],
+            "stop": self.offsets[1:],
+        })
+        write_ipc(rows, os.path.join(directory, ROWS_FILE))
+        write_ipc(groups, os.path.join(directory, GROUPS_FILE))
+
+    @classmethod
+    def from_arrow(cls, directory: str) -> "RiskEngine":
+        """Map a snapshot's engine arrays read-only without copying them."""
+        rows = read_ipc(os.path.join(directory, ROWS_FILE))
+        groups = read_ipc(os.path.join(directory, GROUPS_FILE))
+        metadata = rows.schema.metadata
+        starts = _column(groups, "start").to_numpy(zero_copy_only=False)
+        stops = _column(groups, "stop").to_numpy(zero_copy_only=False)
+
+        engine = cls.__new__(cls)
+        engine._attach(
+            country_names=np.asarray(json.loads(metadata[b"country_names"]), dtype=object),
+            commodity_names=np.asarray(json.loads(metadata[b"commodity_names"]), dtype=object),
+            offsets=np.append(starts, stops[-1] if len(stops) else 0).astype(np.int64),
+            group_commodity=_column(groups, "commodity_code").to_numpy(zero_copy_only=False),
+            group_year=_column(groups, "year").to_numpy(zero_copy_only=False),
+            country_codes=_column(rows, "country_code").to_numpy(zero_copy_only=False),
+            features=_column(rows, "features").flatten().to_numpy(zero_copy_only=False)
+                .reshape(-1, len(feature_cols)),
+            share=_column(rows, "share").to_numpy(zero_copy_only=False),
+            risk=_column(rows, "risk").to_numpy(zero_copy_only=False),
+        )
+        return engine
+
+    def _records(self, rows: np.ndarray, risk: np.ndarray) -> List[Dict]:
+        names = self.country_names[self.country_codes[rows]]
+        return [{"Country": name, "RiskPercentage": round(float(value), 2)} for name, value in zip(names, risk)]
+
+    def group_slice(self, key) -> Optional[slice]:
+        gid = self.group_lookup.get(key)
+        if gid is None:
+            return None
+        return slice(int(self.offsets[gid]), int(self.offsets[gid + 1]))
+
+    def ranked(self, key, top_n: Optional[int] = None) -> Optional[List[Dict]]:
+        """Default-weight country records for one group, highest risk first."""
+        rows = self.group_slice(key)
+        if rows is None:
+            return None
+        rows = np.arange(rows.start, rows.stop)[:top_n]
+        return self._records(rows, self.risk[rows])
+
+    def risk_percentage(self, weights: Optional[np.ndarray] = None) -> np.ndarray:
+        """RiskPercentage for every row, in engine row order."""
+        if weights is None:
+            return self.risk
+        adjusted = (self.features.astype(np.float64) @ weights) * self.share
+        return _percentage(adjusted, _group_sum(adjusted, self.offsets)[self.group_ids])
+
+    def group_risk(self, key, weights: np.ndarray, top_n: Optional[int] = None) -> Optional[List[Dict]]:
+        """Rescore a single (Commodity, Year) group with custom weights."""
+        rows = self.group_slice(key)
+        if rows is None:
+            return None
+        adjusted = (self.features[rows].astype(np.float64) @ weights) * self.share[rows]
+        risk = _percentage(adjusted, adjusted.sum())
+        order = np.argsort(-risk, kind="stable")[:top_n]
+        return self._records(rows.start + order, risk[order])
+
+    def memory_usage(self) -> Dict[str, int]:
+        """Bytes held by each array and by the Python-object name and group lookup tables.
+
+        Object sizes are measured with ``sys.getsizeof``; each object is
+        counted once, so the commodity strings inside the group keys are
+        counted under ``names``.
+        """
+        arrays = {
+            "country_codes": self.country_codes, "features": self.features, "share": self.share,
+            "risk": self.risk, "offsets": self.offsets, "group_ids": self.group_ids,
+            "group_commodity": self.group_commodity, "group_year": self.group_year,
+        }
+        usage = {name: int(array.nbytes) for name, array in arrays.items()}
+        usage["names"] = sum(int(names.nbytes) + sum(sys.getsizeof(name) for name in names)
+                             for names in (self.country_names, self.commodity_names))
+        # group_keys and group_lookup share the same key tuples
+        usage["group_lookup"] = (sys.getsizeof(self.group_lookup) + sys.getsizeof(self.group_keys) +
+                                 sum(sys.getsizeof(key) + sys.getsizeof(key[1]) + sys.getsizeof(gid)
+                                     for key, gid in self.group_lookup.items()))
+        return usage
+
+
+# --- Cube ---
+CUBE_FILE = "risk_cube.npy"
+
+
+def _rounded(values: np.ndarray) -> List[Optional[float]]:
+    return [None if np.isnan(v) else round(float(v), 2) for v in values]
+
+
+class RiskCube:
+    """Default-weight RiskPercentage indexed by (country, commodity, year).
+
+    Axes use the engine's categorical codes and ``year - first_year``;
+    cells without a row are NaN. Saved as ``.npy`` next to the engine's
+    Arrow files and memory-mapped on load.
+    """
+
+    def __init__(self, engine: RiskEngine, values: Optional[np.ndarray] = None):
+        self.country_names = engine.country_names
+        self.commodity_names = engine.commodity_names
+        self.country_lookup = {name: code for code, name in enumerate(engine.country_names)}
+        self.commodity_lookup = {name: code for code, name in enumerate(engine.commodity_names)}
+        if len(engine.group_year):
+            self.years = np.arange(engine.group_year.min(), engine.group_year.max() + 1, dtype=np.int16)
+        else:
+            self.years = np.zeros(0, dtype=np.int16)
+
+        if values is None:
+            values = np.full((len(self.country_names), len(self.commodity_names), len(self.years)),
+                             np.nan, dtype=np.float32)
+            sizes = np.diff(engine.offsets)
+            if len(self.years):
+                row_commodity = np.repeat(engine.group_commodity, sizes)
+                row_year = np.repeat(engine.group_year, sizes) - self.years[0]
+                values[engine.country_codes, row_commodity, row_year] = engine.risk
+        self.values = values
+
+    @classmethod
+    def load(cls, engine: RiskEngine, directory: str) -> "RiskCube":
+        path = os.path.join(directory, CUBE_FILE)
+        if os.path.exists(path):
+            return cls(engine, np.load(path, mmap_mode="r"))
+        return cls(engine)
+
+    def write(self, directory: str):
+        path = os.path.join(directory, CUBE_FILE)
+        with open(f"{path}.tmp", "wb") as f:
+            np.save(f, self.values)
+        os.replace(f"{path}.tmp", path)
+
+    def year_range(self, start_year: Optional[int] = None, end_year: Optional[int] = None) -> slice:
+        if not len(self.years):
+            return slice(0, 0)
+        first = int(self.years[0])
+        start = 0 if start_year is None else max(start_year - first, 0)
+        stop = len(self.years) if end_year is None else min(end_year - first + 1, len(self.years))
+        return slice(start, max(start, stop))
+
+    def _series(self, block: np.ndarray, names: np.ndarray, label: str) -> List[Dict]:
+        # block is (entities, years); deltas for every entity come from one np.diff
+        present = ~np.all(np.isnan(block), axis=1)
+        deltas = np.diff(block, axis=1)
+        return [
+            {label: names[i], "RiskPercentage": _rounded(block[i]), "YoYChange": [None] + _rounded(deltas[i])}
+            for i in np.flatnonzero(present)
+        ]
+
+    def trend(self, commodity: str, start_year: Optional[int] = None, end_year: Optional[int] = None,
+              countries: Optional[List[str]] = None) -> Optional[Dict]:
+        """Every country's yearly risk for one commodity, with year-over-year changes."""
+        code = self.commodity_lookup.get(commodity)
+        years = self.year_range(start_year, end_year)
+        if code is None or years.start == years.stop:
+            return None
+        country_codes = np.arange(len(self.country_names))
+        if countries is not None:
+            country_codes = np.array([self.country_lookup[c] for c in countries if c in self.country_lookup],
+                                     dtype=np.int64)
+        block = np.asarray(self.values[country_codes, code, years])
+        return {"years": self.years[years].tolist(),
+                "series": self._series(block, self.country_names[country_codes], "Country")}
+
+    def country_profile(self, country: str, start_year: Optional[int] = None,
+                        end_year: Optional[int] = None) -> Optional[Dict]:
+        """One country's yearly risk for every commodity it supplies."""
+        code = self.country_lookup.get(country)
+        years = self.year_range(start_year, end_year)
+        if code is None or years.start == years.stop:
+            return None
+        block = np.asarray(self.values[code, :, years])
+        return {"years": self.years[years].tolist(),
+                "series": self._series(block, self.commodity_names, "Commodity")}
+
+    def memory_usage(self) -> Dict[str, int]:
+        return {"values": int(self.values.nbytes)}
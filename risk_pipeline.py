@@ -0,0 +1,527 @@
+"""Offline build of the supply chain risk table.
+
+Runs the full download -> clean -> merge -> normalize pipeline once and
+writes a versioned snapshot that ``risk_api.py`` can load at startup:
+
+    python risk_pipeline.py build
+
+Each snapshot lives in ``<snapshot_dir>/<version>/`` and holds the scoring
+inputs as Parquet plus a ``manifest.json`` with the sha256 of every source
+file. ``<snapshot_dir>/LATEST`` names the version the API should serve.
+The ranked engine arrays are also written as Arrow IPC files that every
+API worker memory-maps read-only, along with the pre-serialized JSON
+listings (``risk_responses.py``), and ``<snapshot_dir>/GENERATION`` is
+bumped on each publish so running workers notice and swap to the new
+version on their own.
+
+When a new year of data lands, apply just the new rows on top of LATEST:
+
+    python risk_pipeline.py refresh --imports imports_2025.csv --lpi lpi_2025.csv
+
+and the running API picks it up within ``RISK_API_WATCH_SECONDS`` (or
+immediately with ``POST /admin/reload``).
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from risk_engine import ROWS_FILE, RiskCube, RiskEngine
+from risk_responses import write_responses
+from source_cache import SOURCE_CACHE_DIR, SourceCache, source_url
+
+# --- Configuration ---
+# URLs can be pointed elsewhere (e.g. a local file server) via environment
+# variables; see source_cache.source_url.
+DEFAULT_SOURCES = {
+    "imports": ("csv", "https://drive.google.com/uc?export=download&id=1nuueoWFkfPRDJjgWtYcfJj0ffoIryvGp"),
+    "lpi": ("csv", "https://drive.google.com/uc?export=download&id=1GlWo2ybad5FhIGnfUkSiQoy792lZIntd"),
+    "wgi": ("xlsx", "https://drive.google.com/uc?export=download&id=11VGF7ldEfBhMd7XQ78q8sNpe-1Nj6kLU"),
+    "consumption": ("csv", "https://drive.google.com/uc?export=download&id=12HzcsHI4Y3hcWafDqobdoNNd8C0heMYC"),
+}
+SOURCES = {name: (kind, source_url(name, kind, url)) for name, (kind, url) in DEFAULT_SOURCES.items()}
+SNAPSHOT_DIR = os.environ.get("RISK_SNAPSHOT_DIR", "snapshots")
+SNAPSHOT_SCHEMA = 6
+FETCH_TIMEOUT = 60
+
+required_cols = [
+    "ImportValueUSD", "LPI_Score",
+    "WGI_ControlOfCorruption", "WGI_GovtEffectiveness", "WGI_PoliticalStability",
+    "WGI_RuleOfLaw", "WGI_RegulatoryQuality", "WGI_VoiceAccountability"
+]
+wgi_cols = [
+    "WGI_ControlOfCorruption", "WGI_GovtEffectiveness", "WGI_PoliticalStability",
+    "WGI_RuleOfLaw", "WGI_RegulatoryQuality", "WGI_VoiceAccountability"
+]
+filtered_cols = [
+    "Country", "Year", "Commodity", "ImportValueUSD", "LPI_Score", "ConsumptionPercentage", *wgi_cols
+]
+feature_table_cols = [
+    "Country", "Year", "Commodity", "ImportValueUSD",
+    "Norm_Imports", "Norm_Consumption", "Norm_LPI", "Norm_WGI"
+]
+
+
+# --- Load Data ---
+def fetch_sources(cache: SourceCache = None) -> dict:
+    """Fetch every source concurrently through the local cache; returns raw bytes by name."""
+    cache = cache or SourceCache(SOURCE_CACHE_DIR, timeout=FETCH_TIMEOUT)
+    return cache.fetch_all(SOURCES)
+
+
+def read_sources(raw: dict, cache: SourceCache = None) -> dict:
+    """Parse raw source bytes; with a cache, Excel sources are read from their Parquet copy."""
+    frames = {}
+    for name, (kind, _) in SOURCES.items():
+        if kind == "xlsx":
+            frames[name] = cache.read_excel(name, raw[name]) if cache else pd.read_excel(io.BytesIO(raw[name]))
+        else:
+            frames[name] = pd.read_csv(io.BytesIO(raw[name]))
+    return frames
+
+
+# --- Clean and Prepare WGI ---
+def clean_wgi(wgi_df: pd.DataFrame) -> pd.DataFrame:
+    wgi_df_cleaned = wgi_df[wgi_df["estimate"] != ".."].copy()
+    wgi_df_cleaned["estimate"] = pd.to_numeric(wgi_df_cleaned["estimate"], errors="coerce")
+    wgi_pivot = wgi_df_cleaned.pivot_table(
+        index=["countryname", "year"],
+        columns="indicator",
+        values="estimate"
+    ).reset_index()
+    wgi_pivot.columns.name = None
+    return wgi_pivot.rename(columns={
+        "countryname": "Country", "year": "Year",
+        "cc": "WGI_ControlOfCorruption", "ge": "WGI_GovtEffectiveness",
+        "rl": "WGI_RuleOfLaw", "rq": "WGI_RegulatoryQuality",
+        "va": "WGI_VoiceAccountability", "pv": "WGI_PoliticalStability"
+    })
+
+
+# --- Clean Other Data Sources ---
+def clean_imports(imports_df: pd.DataFrame) -> pd.DataFrame:
+    return imports_df[imports_df["Country"] != "World Total"].copy()
+
+
+def clean_lpi(lpi_df: pd.DataFrame) -> pd.DataFrame:
+    return lpi_df[["Country", "Year", "LPI_Score_Interpolated"]].rename(
+        columns={"LPI_Score_Interpolated": "LPI_Score"})
+
+
+def clean_consumption(consumption_df: pd.DataFrame) -> pd.DataFrame:
+    return consumption_df.rename(columns={
+        "Year": "ConsumptionYear", "Commodity type": "Commodity",
+        "Overall consumption percentage": "ConsumptionPercentage"
+    })
+
+
+CLEANERS = {
+    "imports": clean_imports,
+    "lpi": clean_lpi,
+    "wgi": clean_wgi,
+    "consumption": clean_consumption,
+}
+# Rows in each cleaned source are identified by these columns.
+SOURCE_KEYS = {
+    "imports": ["Country", "Year", "Commodity"],
+    "lpi": ["Country", "Year"],
+    "wgi": ["Country", "Year"],
+    "consumption": ["ConsumptionYear", "Commodity"],
+}
+
+
+# --- Merge All ---
+def merge_sources(cleaned: dict) -> pd.DataFrame:
+    merged = cleaned["imports"].merge(cleaned["lpi"], on=["Country", "Year"], how="left")
+    merged = merged.merge(cleaned["wgi"], on=["Country", "Year"], how="left")
+    return merged.merge(cleaned["consumption"][["ConsumptionYear", "Commodity", "ConsumptionPercentage"]],
+                        left_on=["Year", "Commodity"],
+                        right_on=["ConsumptionYear", "Commodity"],
+                        how="left")
+
+
+# --- Filter Valid Rows ---
+def filter_valid(merged: pd.DataFrame) -> pd.DataFrame:
+    return merged.dropna(subset=required_cols).copy()
+
+
+# --- Normalize Inputs ---
+# Min-max scaling as MinMaxScaler does it, but with the fitted bounds kept so
+# an incremental refresh can scale new rows exactly like the full build did.
+normalized_cols = {
+    "Norm_Imports": ("ImportValueUSD", False),
+    "Norm_LPI": ("LPI_Score", True),
+    "Norm_Consumption": ("ConsumptionPercentage", False),
+    **{f"Norm_{col}": (col, True) for col in wgi_cols},
+}
+
+
+def _scaling_input(filtered_df: pd.DataFrame, col: str) -> pd.Series:
+    if col == "ConsumptionPercentage":
+        return filtered_df[col].fillna(0)
+    return filtered_df[col]
+
+
+def compute_bounds(filtered_df: pd.DataFrame) -> dict:
+    bounds = {}
+    for col, _ in normalized_cols.values():
+        values = _scaling_input(filtered_df, col)
+        bounds[col] = [float(values.min()), float(values.max())]
+    return bounds
+
+
+def normalize(filtered_df: pd.DataFrame, bounds: dict = None) -> pd.DataFrame:
+    bounds = bounds or compute_bounds(filtered_df)
+    for norm_col, (col, inverted) in normalized_cols.items():
+        low, high = bounds[col]
+        scaled = (_scaling_input(filtered_df, col) - low) / ((high - low) or 1.0)
+        filtered_df[norm_col] = 1 - scaled if inverted else scaled
+    return filtered_df
+
+
+# --- Scoring Inputs ---
+def feature_table(filtered_df: pd.DataFrame) -> pd.DataFrame:
+    """Keep the columns the scoring engine needs; weights are applied at serve time."""
+    filtered_df["Norm_WGI"] = filtered_df[[f"Norm_{col}" for col in wgi_cols]].mean(axis=1)
+    return filtered_df[feature_table_cols].reset_index(drop=True)
+
+
+def _timed(stats: dict, stage: str, fn, *args):
+    started = time.perf_counter()
+    value = fn(*args)
+    stats.setdefault("seconds", {})[stage] = round(time.perf_counter() - started, 4)
+    return value
+
+
+def run_pipeline(frames: dict, stats: dict = None):
+    """Turn the four raw source frames into ``(cleaned, filtered_df, features_df, bounds)``.
+
+    ``filtered_df`` holds the merged, pre-normalization rows and lines up
+    row for row with ``features_df``. ``stats``, when given, collects the
+    ``seconds`` each stage took and the ``rows`` left after each step.
+    """
+    stats = {} if stats is None else stats
+    rows = stats.setdefault("rows", {})
+    cleaned = {}
+    for name, frame in frames.items():
+        cleaned[name] = _timed(stats, "wgi_pivot" if name == "wgi" else f"clean_{name}", CLEANERS[name], frame)
+        rows[f"{name}_raw"], rows[f"{name}_clean"] = len(frame), len(cleaned[name])
+    merged = _timed(stats, "merges", merge_sources, cleaned)
+    rows["merged"] = len(merged)
+    filtered_df = _timed(stats, "filter", filter_valid, merged).reset_index(drop=True)
+    rows["filtered"] = len(filtered_df)
+    bounds = compute_bounds(filtered_df)
+    features_df = feature_table(_timed(stats, "normalize", normalize, filtered_df, bounds))
+    rows["features"] = len(features_df)
+    return cleaned, filtered_df[filtered_cols], features_df, bounds
+
+
+# --- Snapshots ---
+def snapshot_version(checksums: dict, parent: str = "") -> str:
+    digest = hashlib.sha256(f"schema={SNAPSHOT_SCHEMA};parent={parent}".encode())
+    for name in sorted(checksums):
+        digest.update(f"{name}={checksums[name]}".encode())
+    return digest.hexdigest()[:16]
+
+
+def _write_atomic(path: str, text: str):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def _write_snapshot(snapshot_dir: str, manifest: dict, cleaned: dict,
+                    filtered_df: pd.DataFrame, features_df: pd.DataFrame,
+                    parent_dir: str = None, affected: set = None):
+    version_dir = os.path.join(snapshot_dir, manifest["version"])
+    os.makedirs(os.path.join(version_dir, "inputs"), exist_ok=True)
+    stats = manifest.setdefault("stages", {})
+    for name, frame in cleaned.items():
+        frame.to_parquet(os.path.join(version_dir, "inputs", f"{name}.parquet"), index=False)
+    filtered_df.to_parquet(os.path.join(version_dir, "filtered.parquet"), index=False)
+    features_df.to_parquet(os.path.join(version_dir, "features.parquet"), index=False)
+    engine = _timed(stats, "grouping", RiskEngine, features_df)
+    engine.write_arrow(version_dir)
+    RiskCube(engine).write(version_dir)
+    _timed(stats, "serialize", write_responses, engine, version_dir, parent_dir, affected)
+    # manifest.json is written last; its presence marks the version complete.
+    _write_atomic(os.path.join(version_dir, "manifest.json"), json.dumps(manifest, indent=2))
+
+
+def _publish(snapshot_dir: str, version: str):
+    _write_atomic(os.path.join(snapshot_dir, "LATEST"), version)
+    _write_atomic(os.path.join(snapshot_dir, "GENERATION"), str(current_generation(snapshot_dir) + 1))
+
+
+def _utc_now() -> str:
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+
+def build_snapshot(snapshot_dir: str = SNAPSHOT_DIR, raw: dict = None) -> dict:
+    """Run the full pipeline and publish the result as the LATEST snapshot.
+
+    ``raw`` maps source names to file bytes; the sources are fetched
+    through the local source cache when it is omitted.
+    """
+    started = time.time()
+    stats, cache = {}, None
+    if raw is None:
+        cache = SourceCache(SOURCE_CACHE_DIR, timeout=FETCH_TIMEOUT)
+        raw = _timed(stats, "fetch", fetch_sources, cache)
+    checksums = {name: hashlib.sha256(data).hexdigest() for name, data in raw.items()}
+    version = snapshot_version(checksums)
+
+    if not os.path.exists(os.path.join(snapshot_dir, version, "manifest.json")):
+        frames = _timed(stats, "load", read_sources, raw, cache)
+        cleaned, filtered_df, features_df, bounds = run_pipeline(frames, stats)
+        manifest = {
+            "version": version,
+            "schema": SNAPSHOT_SCHEMA,
+            "parent": None,
+            "created_at": _utc_now(),
+            "build_seconds": round(time.time() - started, 3),
+            "rows": len(features_df),
+            "bounds": bounds,
+            "sources": {
+                name: {"url": SOURCES[name][1], "sha256": checksums[name], "bytes": len(raw[name])}
+                for name in SOURCES
+            },
+            "updates": [],
+            "stages": stats,
+        }
+        _write_snapshot(snapshot_dir, manifest, cleaned, filtered_df, features_df)
+
+    _publish(snapshot_dir, version)
+    return read_manifest(version, snapshot_dir)
+
+
+# --- Incremental Refresh ---
+class RenormalizationRequired(ValueError):
+    """New rows moved a global min/max, so every row must be rescaled."""
+
+    def __init__(self, shifted_columns):
+        self.shifted_columns = shifted_columns
+        super().__init__(f"New data shifts the normalization bounds of {shifted_columns}; "
+                         "a full renormalization is needed.")
+
+
+def _key_mask(df: pd.DataFrame, cols: list, keys_df: pd.DataFrame) -> np.ndarray:
+    if df.empty or keys_df.empty:
+        return np.zeros(len(df), dtype=bool)
+    keys = pd.MultiIndex.from_frame(keys_df[cols].drop_duplicates())
+    return pd.MultiIndex.from_frame(df[cols]).isin(keys)
+
+
+def _changed_rows(current: pd.DataFrame, delta: pd.DataFrame) -> pd.DataFrame:
+    """Rows of ``delta`` that are not already present verbatim in ``current``."""
+    if current.empty or delta.empty:
+        return delta
+    common = [col for col in delta.columns if col in current.columns]
+    seen = delta.merge(current[common].drop_duplicates(), on=common, how="left", indicator=True)
+    return delta[(seen["_merge"] == "left_only").to_numpy()]
+
+
+def _upsert(current: pd.DataFrame, delta: pd.DataFrame, keys: list) -> pd.DataFrame:
+    """Apply ``delta`` on top of ``current``, keyed by ``keys``.
+
+    Values the delta carries replace the existing ones; columns it lacks or
+    leaves NaN keep their current values. A WGI revision of one indicator
+    therefore leaves the country's other ``WGI_*`` columns intact.
+    """
+    delta = delta.drop_duplicates(keys, keep="last")
+    stale = _key_mask(current, keys, delta)
+    merged = delta.set_index(keys).combine_first(current[stale].set_index(keys)).reset_index()
+    columns = list(current.columns) + [col for col in merged.columns if col not in current.columns]
+    merged = merged[columns]
+    # combine_first upcasts ints it had to align; restore them where nothing is missing
+    merged = merged.astype({col: current[col].dtype for col in current.columns
+                            if merged[col].dtype != current[col].dtype and not merged[col].isna().any()})
+    return pd.concat([current[~stale], merged], ignore_index=True)
+
+
+def _group_keys(df: pd.DataFrame) -> set:
+    return {(commodity, int(year)) for commodity, year in
+            df[["Commodity", "Year"]].drop_duplicates().itertuples(index=False)}
+
+
+def refresh_snapshot(updates: dict, snapshot_dir: str = SNAPSHOT_DIR,
+                     allow_renormalize: bool = True) -> dict:
+    """Apply new or changed source rows on top of the LATEST snapshot.
+
+    ``updates`` maps source names to raw frames in the same layout as the
+    original files. Only imports rows whose inputs changed are re-merged, and
+    only their (Commodity, Year) groups are listed as affected. If the new
+    rows move any global min/max the whole table is renormalized (or
+    ``RenormalizationRequired`` is raised when ``allow_renormalize`` is off).
+    """
+    started = time.time()
+    parent = latest_version(snapshot_dir)
+    parent_dir = os.path.join(snapshot_dir, parent)
+    parent_manifest = read_manifest(parent, snapshot_dir)
+    stats = {"seconds": {}, "rows": {}}
+    load_started = time.perf_counter()
+    cleaned = {name: pd.read_parquet(os.path.join(parent_dir, "inputs", f"{name}.parquet"))
+               for name in SOURCES}
+    filtered_df = pd.read_parquet(os.path.join(parent_dir, "filtered.parquet"))
+    features_df = pd.read_parquet(os.path.join(parent_dir, "features.parquet"))
+    stats["seconds"]["load"] = round(time.perf_counter() - load_started, 4)
+
+    # 1. Keep only rows that are new or differ from what the snapshot has
+    changed = {}
+    for name, frame in updates.items():
+        delta = _changed_rows(cleaned[name], CLEANERS[name](frame))
+        stats["rows"][f"{name}_changed"] = len(delta)
+        if not delta.empty:
+            changed[name] = delta
+            cleaned[name] = _upsert(cleaned[name], delta, SOURCE_KEYS[name])
+    if not changed:
+        return parent_manifest
+
+    # 2. Find the imports rows whose merged inputs changed and re-merge them
+    imports = cleaned["imports"]
+    touched = np.zeros(len(imports), dtype=bool)
+    if "imports" in changed:
+        touched |= _key_mask(imports, SOURCE_KEYS["imports"], changed["imports"])
+    for name in ("lpi", "wgi"):
+        if name in changed:
+            touched |= _key_mask(imports, ["Country", "Year"], changed[name])
+    if "consumption" in changed:
+        touched |= _key_mask(imports, ["Year", "Commodity"],
+                             changed["consumption"].rename(columns={"ConsumptionYear": "Year"}))
+    touched_imports = imports[touched]
+    merged = _timed(stats, "merges", merge_sources, {**cleaned, "imports": touched_imports})
+    rebuilt = filter_valid(merged).reset_index(drop=True)
+    stats["rows"]["merged"], stats["rows"]["rebuilt"] = len(merged), len(rebuilt)
+
+    # filtered_df and features_df line up row for row, so one mask drops both
+    stale = _key_mask(filtered_df, SOURCE_KEYS["imports"], touched_imports)
+    affected = _group_keys(filtered_df[stale]) | _group_keys(rebuilt)
+    new_filtered = pd.concat([filtered_df[~stale], rebuilt[filtered_cols]], ignore_index=True)
+
+    # 3. Rescale only the rebuilt rows unless the global bounds moved
+    bounds = compute_bounds(new_filtered)
+    shifted = [col for col in bounds if bounds[col] != parent_manifest["bounds"][col]]
+    if shifted:
+        if not allow_renormalize:
+            raise RenormalizationRequired(shifted)
+        new_features = feature_table(_timed(stats, "normalize", normalize, new_filtered.copy(), bounds))
+        affected = _group_keys(new_features)
+    else:
+        rebuilt_features = feature_table(_timed(stats, "normalize", normalize, rebuilt, bounds))
+        new_features = pd.concat([features_df[~stale], rebuilt_features], ignore_index=True)
+
+    checksums = {name: hashlib.sha256(pd.util.hash_pandas_object(delta, index=False).to_numpy().tobytes())
+                 .hexdigest() for name, delta in changed.items()}
+    version = snapshot_version(checksums, parent=parent)
+    manifest = {
+        **parent_manifest,
+        "version": version,
+        "parent": parent,
+        "created_at": _utc_now(),
+        "build_seconds": round(time.time() - started, 3),
+        "rows": len(new_features),
+        "bounds": bounds,
+        "renormalized": bool(shifted),
+        "shifted_columns": shifted,
+        "affected_groups": sorted([commodity, year] for commodity, year in affected),
+        "updates": parent_manifest.get("updates", []) + [{
+            "created_at": _utc_now(),
+            "changed_rows": {name: len(delta) for name, delta in changed.items()},
+            "sha256": checksums,
+        }],
+        "stages": stats,
+    }
+    stats["rows"]["features"] = len(new_features)
+    # Listings of groups the refresh did not touch are copied from the parent
+    _write_snapshot(snapshot_dir, manifest, cleaned, new_filtered, new_features,
+                    None if shifted else parent_dir, affected)
+    _publish(snapshot_dir, version)
+    return manifest
+
+
+# --- Loading ---
+def latest_version(snapshot_dir: str = SNAPSHOT_DIR) -> str:
+    latest_path = os.path.join(snapshot_dir, "LATEST")
+    if not os.path.exists(latest_path):
+        raise FileNotFoundError(
+            f"No risk snapshot found in {snapshot_dir!r}. "
+            "Run `python risk_pipeline.py build` or start the API with RISK_API_REBUILD=1."
+        )
+    with open(latest_path) as f:
+        return f.read().strip()
+
+
+def read_manifest(version: str, snapshot_dir: str = SNAPSHOT_DIR) -> dict:
+    with open(os.path.join(snapshot_dir, version, "manifest.json")) as f:
+        return json.load(f)
+
+
+def load_engine(snapshot_dir: str = SNAPSHOT_DIR):
+    """Return ``(engine, cube, manifest)`` for the LATEST snapshot.
+
+    The engine and cube are memory-mapped from the snapshot's Arrow and
+    ``.npy`` files; snapshots written before those existed are scored from
+    ``features.parquet``.
+    """
+    version = latest_version(snapshot_dir)
+    manifest = read_manifest(version, snapshot_dir)
+    version_dir = os.path.join(snapshot_dir, version)
+    if os.path.exists(os.path.join(version_dir, ROWS_FILE)):
+        engine = RiskEngine.from_arrow(version_dir)
+    else:
+        engine = RiskEngine(pd.read_parquet(os.path.join(version_dir, "features.parquet")))
+    return engine, RiskCube.load(engine, version_dir), manifest
+
+
+def current_generation(snapshot_dir: str = SNAPSHOT_DIR) -> int:
+    """Publish counter; 0 when nothing has been published yet."""
+    try:
+        with open(os.path.join(snapshot_dir, "GENERATION")) as f:
+            return int(f.read().strip() or 0)
+    except FileNotFoundError:
+        return 0
+
+
+def read_source_file(path: str) -> pd.DataFrame:
+    if path.endswith((".xlsx", ".xls")):
+        return pd.read_excel(path)
+    return pd.read_csv(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or refresh the supply chain risk snapshot.")
+    parser.add_argument("command", choices=["build", "refresh"])
+    parser.add_argument("--snapshot-dir", default=SNAPSHOT_DIR)
+    for name in SOURCES:
+        parser.add_argument(f"--{name}", help=f"refresh: file with new or changed {name} rows")
+    parser.add_argument("--no-renormalize", action="store_true",
+                        help="refresh: fail instead of renormalizing when global bounds move")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        manifest = build_snapshot(args.snapshot_dir)
+        print(f"Snapshot {manifest['version']}: {manifest['rows']} rows "
+              f"(built in {manifest['build_seconds']}s)")
+    else:
+        updates = {name: read_source_file(getattr(args, name))
+                   for name in SOURCES if getattr(args, name)}
+        if not updates:
+            parser.error("refresh needs at least one of " + ", ".join(f"--{name}" for name in SOURCES))
+        parent = latest_version(args.snapshot_dir)
+        try:
+            manifest = refresh_snapshot(updates, args.snapshot_dir,
+                                        allow_renormalize=not args.no_renormalize)
+        except RenormalizationRequired as e:
+            raise SystemExit(str(e))
+        if manifest["version"] == parent:
+            print(f"No new or changed rows; snapshot {parent} is unchanged.")
+        else:
+            print(f"Snapshot {manifest['version']} (from {parent}): "
+                  f"{len(manifest['affected_groups'])} groups recomputed"
+                  + (f", renormalized for {manifest['shifted_columns']}" if manifest["renormalized"] else ""))
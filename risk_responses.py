@@ -0,0 +1,176 @@
+"""Pre-serialized JSON for the default-weight listing endpoints.
+
+Every (Commodity, Year) listing is encoded once, when the snapshot is
+written, and stored as one byte blob in engine row order. Each record is
+stored as ``{...},`` and ``row_offsets`` marks where each row's record
+starts, so a ``/top-risk-countries/`` body is a byte prefix of the full
+listing. The full ``/risk-score/`` payloads are also stored gzip-compressed.
+All files are memory-mapped, like the engine arrays. An incremental
+refresh re-encodes only its affected groups and copies the rest from the
+parent snapshot.
+
+ETags are strong and derived from the snapshot version, so they change
+exactly when the data does. Records are encoded with ``orjson``, which
+required_api.txt installs; the standard ``json`` module with FastAPI's
+compact separators is only a fallback for environments without it.
+"""
+import gzip
+import json
+import mmap
+import os
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from risk_engine import RiskEngine
+
+try:
+    import orjson
+
+    def dumps(obj) -> bytes:
+        return orjson.dumps(obj)
+except ImportError:
+    def dumps(obj) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+RECORDS_FILE = "listings.bin"
+ROW_OFFSETS_FILE = "listings_offsets.npy"
+GZIP_FILE = "listings_full.gz"
+GZIP_OFFSETS_FILE = "listings_full_offsets.npy"
+
+
+def payload(commodity: str, year: int, field: str, records: bytes) -> bytes:
+    """``{"commodity":..,"year":..,"<field>":[records]}`` around already-encoded records."""
+    return b"".join([b'{"commodity":', dumps(commodity), b',"year":', str(int(year)).encode(),
+                     b',"', field.encode(), b'":[', records, b"]}"])
+
+
+def serialize(engine: RiskEngine, parent: Optional["ResponseStore"] = None,
+              affected: Optional[Iterable] = None) -> Tuple[bytes, np.ndarray, bytes, np.ndarray]:
+    """Return ``(records, row_offsets, gzipped, gzip_offsets)`` for every group.
+
+    With a ``parent`` store, groups it also has that are not in ``affected``
+    are copied from its bytes rather than re-encoded.
+    """
+    affected = {(commodity, int(year)) for commodity, year in affected or ()}
+    records: List[bytes] = []
+    row_offsets = np.zeros(len(engine.risk) + 1, dtype=np.int64)
+    gzipped: List[bytes] = []
+    gzip_offsets = np.zeros(len(engine.group_keys) + 1, dtype=np.int64)
+    position = 0
+    for gid, (commodity, year) in enumerate(engine.group_keys):
+        start, stop = int(engine.offsets[gid]), int(engine.offsets[gid + 1])
+        pid = None if parent is None or (commodity, year) in affected else \
+            parent.engine.group_lookup.get((commodity, year))
+        if pid is not None:
+            # Unchanged group: same rows in the same order, so reuse its bytes
+            pstart = int(parent.engine.offsets[pid])
+            ends = np.asarray(parent.row_offsets[pstart:pstart + stop - start + 1], dtype=np.int64)
+            records.append(bytes(parent.records[int(ends[0]):int(ends[-1])]))
+            row_offsets[start + 1:stop + 1] = ends[1:] - ends[0] + position
+            position += int(ends[-1] - ends[0])
+            gzipped.append(bytes(parent.gzipped[int(parent.gzip_offsets[pid]):int(parent.gzip_offsets[pid + 1])]))
+            gzip_offsets[gid + 1] = gzip_offsets[gid] + len(gzipped[-1])
+            continue
+        group = []
+        for i, record in enumerate(engine.ranked((commodity, year))):
+            if record["RiskPercentage"] != record["RiskPercentage"]:  # NaN is not valid JSON
+                record["RiskPercentage"] = None
+            encoded = dumps(record) + b","
+            group.append(encoded)
+            position += len(encoded)
+            row_offsets[start + i + 1] = position
+        records.extend(group)
+        full = payload(commodity, year, "all_countries", b"".join(group)[:-1])
+        # mtime=0 keeps the compressed bytes identical across rebuilds
+        gzipped.append(gzip.compress(full, compresslevel=9, mtime=0))
+        gzip_offsets[gid + 1] = gzip_offsets[gid] + len(gzipped[-1])
+    return b"".join(records), row_offsets, b"".join(gzipped), gzip_offsets
+
+
+def _write_atomic(path: str, data: bytes):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _write_npy(path: str, array: np.ndarray):
+    with open(f"{path}.tmp", "wb") as f:
+        np.save(f, array)
+    os.replace(f"{path}.tmp", path)
+
+
+def write_responses(engine: RiskEngine, directory: str, parent_dir: Optional[str] = None,
+                    affected: Optional[Iterable] = None):
+    """Serialize ``engine``'s listings into ``directory``.
+
+    ``parent_dir`` and ``affected`` come from an incremental refresh: only
+    the ``affected`` groups are encoded, the rest are copied from the parent
+    snapshot's listings when it has them.
+    """
+    parent = None
+    if parent_dir is not None and os.path.exists(os.path.join(parent_dir, GZIP_OFFSETS_FILE)):
+        parent = ResponseStore.load(RiskEngine.from_arrow(parent_dir), parent_dir, os.path.basename(parent_dir))
+    records, row_offsets, gzipped, gzip_offsets = serialize(engine, parent, affected)
+    _write_atomic(os.path.join(directory, RECORDS_FILE), records)
+    _write_atomic(os.path.join(directory, GZIP_FILE), gzipped)
+    _write_npy(os.path.join(directory, ROW_OFFSETS_FILE), row_offsets)
+    _write_npy(os.path.join(directory, GZIP_OFFSETS_FILE), gzip_offsets)
+
+
+def _map(path: str):
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    # If-None-Match uses weak comparison, so W/"x" matches "x"
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+class ResponseStore:
+    def __init__(self, engine: RiskEngine, version: str, records, row_offsets, gzipped, gzip_offsets):
+        self.engine = engine
+        self.version = version
+        self.records = records
+        self.row_offsets = row_offsets
+        self.gzipped = gzipped
+        self.gzip_offsets = gzip_offsets
+
+    @classmethod
+    def load(cls, engine: RiskEngine, directory: str, version: str) -> "ResponseStore":
+        """Map the snapshot's serialized listings, or serialize them now if it has none."""
+        if os.path.exists(os.path.join(directory, GZIP_OFFSETS_FILE)):
+            return cls(engine, version,
+                       _map(os.path.join(directory, RECORDS_FILE)),
+                       np.load(os.path.join(directory, ROW_OFFSETS_FILE), mmap_mode="r"),
+                       _map(os.path.join(directory, GZIP_FILE)),
+                       np.load(os.path.join(directory, GZIP_OFFSETS_FILE), mmap_mode="r"))
+        return cls(engine, version, *serialize(engine))
+
+    def listing(self, commodity: str, year: int, top_n: Optional[int] = None,
+                accept_gzip: bool = False) -> Optional[Tuple[bytes, str, Optional[str]]]:
+        """``(body, etag, content_encoding)`` for one listing, or None if the key is unknown.
+
+        ``top_n=None`` is the full ``/risk-score/`` payload (gzip-compressed
+        when accepted); otherwise the ``/top-risk-countries/`` payload.
+        """
+        gid = self.engine.group_lookup.get((commodity, year))
+        if gid is None:
+            return None
+        if top_n is None and accept_gzip:
+            body = self.gzipped[int(self.gzip_offsets[gid]):int(self.gzip_offsets[gid + 1])]
+            return bytes(body), f'"{self.version}-{gid}-all-gz"', "gzip"
+
+        start, stop = int(self.engine.offsets[gid]), int(self.engine.offsets[gid + 1])
+        count = len(range(start, stop)[:top_n])
+        body = self.records[int(self.row_offsets[start]):int(self.row_offsets[start + count])][:-1]
+        field = "all_countries" if top_n is None else "top_risks"
+        tag = "all" if top_n is None else count
+        return payload(commodity, year, field, bytes(body)), f'"{self.version}-{gid}-{tag}"', None
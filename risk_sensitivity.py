@@ -0,0 +1,178 @@
+"""Monte Carlo sensitivity of the risk rankings to the blend weights.
+
+    python risk_sensitivity.py --samples 2000 --workers 8
+
+Weight vectors are drawn from a Dirichlet centred on ``DEFAULT_WEIGHTS``
+(``--concentration`` sets how tightly). Every (Commodity, Year) group is
+rescored against all samples at once as one ``(rows, samples)`` matrix
+product. The catalog is split into chunks of whole groups and spread over
+a process pool; each worker memory-maps the snapshot's engine arrays
+instead of receiving a copy.
+
+Per country and group the result holds:
+- the 5th/50th/95th percentiles of RiskPercentage and of rank
+- the mean rank
+- the probability of ranking first, or in the top N
+
+It is written to ``sensitivity.arrow`` in the LATEST snapshot, row-aligned
+with the engine, and served by ``/risk-sensitivity/``.
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+import pyarrow as pa
+
+from risk_engine import DEFAULT_WEIGHTS, RiskEngine, read_ipc, write_ipc
+from risk_pipeline import SNAPSHOT_DIR, latest_version
+
+SENSITIVITY_FILE = "sensitivity.arrow"
+DEFAULT_SAMPLES = 2000
+DEFAULT_CONCENTRATION = 50.0
+DEFAULT_TOP_N = 3
+MAX_CHUNK_CELLS = 5_000_000  # rows x samples scored per task
+BAND_COLUMNS = ["risk_p5", "risk_p50", "risk_p95", "rank_p5", "rank_p50", "rank_p95",
+                "rank_mean", "top1_probability", "top_n_probability"]
+
+
+def sample_weights(n_samples: int, concentration: float = DEFAULT_CONCENTRATION, seed: int = 0) -> np.ndarray:
+    """``(n_samples, 4)`` weight vectors that sum to 1, centred on the default blend."""
+    rng = np.random.default_rng(seed)
+    return rng.dirichlet(DEFAULT_WEIGHTS / DEFAULT_WEIGHTS.sum() * concentration, size=n_samples)
+
+
+def _chunks(offsets: np.ndarray, n_samples: int) -> List[tuple]:
+    """Split the groups into ``(first_group, stop_group)`` ranges of bounded size."""
+    max_rows = max(MAX_CHUNK_CELLS // n_samples, 1)
+    chunks, first = [], 0
+    for gid in range(1, len(offsets)):
+        if offsets[gid] - offsets[first] > max_rows and gid - 1 > first:
+            chunks.append((first, gid - 1))
+            first = gid - 1
+    if len(offsets) > 1:
+        chunks.append((first, len(offsets) - 1))
+    return chunks
+
+
+def score_chunk(engine: RiskEngine, first: int, stop: int, weights: np.ndarray, top_n: int) -> np.ndarray:
+    """Band columns for the rows of groups ``first..stop-1``, shaped ``(rows, len(BAND_COLUMNS))``."""
+    offsets = engine.offsets[first:stop + 1] - engine.offsets[first]
+    rows = slice(int(engine.offsets[first]), int(engine.offsets[stop]))
+
+    # 1. All samples for all rows in the chunk: (rows, 4) @ (4, samples)
+    adjusted = (engine.features[rows].astype(np.float64) @ weights.T) * engine.share[rows, None]
+    totals = np.add.reduceat(adjusted, offsets[:-1], axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        risk = adjusted / np.repeat(totals, np.diff(offsets), axis=0) * 100
+
+    # 2. Rank within each group, per sample
+    ranks = np.empty(risk.shape, dtype=np.float64)
+    for start, end in zip(offsets[:-1], offsets[1:]):
+        order = np.argsort(-np.nan_to_num(risk[start:end], nan=-np.inf), axis=0, kind="stable")
+        np.put_along_axis(ranks[start:end], order, np.arange(1, end - start + 1, dtype=np.float64)[:, None], axis=0)
+
+    bands = np.empty((len(risk), len(BAND_COLUMNS)), dtype=np.float32)
+    bands[:, 0:3] = np.percentile(risk, [5, 50, 95], axis=1).T
+    bands[:, 3:6] = np.percentile(ranks, [5, 50, 95], axis=1).T
+    bands[:, 6] = ranks.mean(axis=1)
+    bands[:, 7] = (ranks == 1).mean(axis=1)
+    bands[:, 8] = (ranks <= top_n).mean(axis=1)
+    return bands
+
+
+# --- Process Pool ---
+_worker_engine: Optional[RiskEngine] = None
+
+
+def _init_worker(directory: str):
+    global _worker_engine
+    _worker_engine = RiskEngine.from_arrow(directory)
+
+
+def _score_in_worker(first: int, stop: int, weights: np.ndarray, top_n: int) -> np.ndarray:
+    return score_chunk(_worker_engine, first, stop, weights, top_n)
+
+
+def compute_bands(directory: str, n_samples: int = DEFAULT_SAMPLES, concentration: float = DEFAULT_CONCENTRATION,
+                  top_n: int = DEFAULT_TOP_N, workers: Optional[int] = None, seed: int = 0) -> dict:
+    """Score every group of the snapshot in ``directory`` and write its bands."""
+    started = time.perf_counter()
+    engine = RiskEngine.from_arrow(directory)
+    weights = sample_weights(n_samples, concentration, seed)
+    chunks = _chunks(engine.offsets, n_samples)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        parts = [score_chunk(engine, first, stop, weights, top_n) for first, stop in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(directory,)) as pool:
+            futures = [pool.submit(_score_in_worker, first, stop, weights, top_n) for first, stop in chunks]
+            parts = [future.result() for future in futures]
+    bands = np.concatenate(parts) if parts else np.zeros((0, len(BAND_COLUMNS)), dtype=np.float32)
+
+    params = {"samples": n_samples, "concentration": concentration, "top_n": top_n, "seed": seed,
+              "rows": len(bands), "seconds": round(time.perf_counter() - started, 3)}
+    table = pa.table({name: bands[:, i] for i, name in enumerate(BAND_COLUMNS)})
+    write_ipc(table.replace_schema_metadata({"params": json.dumps(params)}), os.path.join(directory, SENSITIVITY_FILE))
+    return params
+
+
+# --- Serving ---
+class SensitivityBands:
+    """Sensitivity bands of one snapshot, row-aligned with its engine."""
+
+    def __init__(self, table: pa.Table):
+        self.params = json.loads(table.schema.metadata[b"params"])
+        self.columns = {name: table.column(name).to_numpy() for name in BAND_COLUMNS}
+
+    @classmethod
+    def load(cls, directory: str, engine: RiskEngine) -> Optional["SensitivityBands"]:
+        path = os.path.join(directory, SENSITIVITY_FILE)
+        if not os.path.exists(path):
+            return None
+        bands = cls(read_ipc(path))
+        return bands if bands.params["rows"] == len(engine.risk) else None
+
+    def records(self, engine: RiskEngine, rows: slice, top_n: Optional[int] = None) -> List[Dict]:
+        """Bands for one group's rows, in default-weight rank order."""
+        rows = np.arange(rows.start, rows.stop)[:top_n]
+        col = {name: values[rows] for name, values in self.columns.items()}
+        names = engine.country_names[engine.country_codes[rows]]
+
+        def value(name: str, i: int, digits: int = 2) -> Optional[float]:
+            v = float(col[name][i])
+            return None if np.isnan(v) else round(v, digits)
+
+        def band(prefix: str, i: int) -> Dict:
+            return {p: value(f"{prefix}_{p}", i) for p in ("p5", "p50", "p95")}
+
+        return [{
+            "Country": name,
+            "RiskPercentage": round(float(engine.risk[row]), 2),
+            "RiskBand": band("risk", i),
+            "RankBand": band("rank", i),
+            "MeanRank": value("rank_mean", i),
+            "Top1Probability": value("top1_probability", i, 3),
+            "TopNProbability": value("top_n_probability", i, 3),
+        } for i, (name, row) in enumerate(zip(names, rows))]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compute weight-sensitivity bands for the LATEST snapshot.")
+    parser.add_argument("--snapshot-dir", default=SNAPSHOT_DIR)
+    parser.add_argument("--samples", type=int, default=DEFAULT_SAMPLES)
+    parser.add_argument("--concentration", type=float, default=DEFAULT_CONCENTRATION,
+                        help="Dirichlet concentration; higher keeps samples closer to the default weights")
+    parser.add_argument("--top-n", type=int, default=DEFAULT_TOP_N)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    version = latest_version(args.snapshot_dir)
+    params = compute_bands(os.path.join(args.snapshot_dir, version), args.samples, args.concentration,
+                           args.top_n, args.workers, args.seed)
+    print(f"Snapshot {version}: bands for {params['rows']} rows from {params['samples']} samples "
+          f"in {params['seconds']}s")
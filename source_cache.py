@@ -0,0 +1,146 @@
+"""Local disk cache for the risk pipeline's source files.
+
+Sources are fetched concurrently. Each one is stored as
+``<cache_dir>/<name>.<kind>`` next to a ``<name>.json`` record of its
+URL, ETag, Last-Modified and sha256. Later fetches send ``If-None-Match``
+/ ``If-Modified-Since`` and keep the cached bytes on a 304. Servers that
+ignore conditional requests still send the body, and the sha256 shows
+whether it changed. If the server can't be reached, the last good copy
+is used.
+
+Excel sources are parsed once per checksum and kept as Parquet, so an
+unchanged WGI workbook skips ``read_excel`` on later builds.
+
+To test without Google Drive, serve files named like the cache entries
+(``imports.csv``, ``wgi.xlsx``, ...) from any directory:
+
+    python benchmarks/synthetic_data.py --out synthetic_sources
+    python -m http.server 8000 -d synthetic_sources
+    RISK_SOURCE_BASE_URL=http://localhost:8000 python risk_pipeline.py build
+"""
+import glob
+import hashlib
+import io
+import json
+import logging
+import os
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+import pandas as pd
+
+SOURCE_CACHE_DIR = os.environ.get("RISK_SOURCE_CACHE_DIR", "source_cache")
+SOURCE_BASE_URL = os.environ.get("RISK_SOURCE_BASE_URL")
+MAX_AGE = float(os.environ.get("RISK_SOURCE_MAX_AGE", "0"))  # seconds to trust a copy without revalidating
+logger = logging.getLogger(__name__)
+
+
+def source_url(name: str, kind: str, default: str) -> str:
+    """``RISK_SOURCE_<NAME>_URL``, else ``RISK_SOURCE_BASE_URL/<name>.<kind>``, else ``default``."""
+    override = os.environ.get(f"RISK_SOURCE_{name.upper()}_URL")
+    if override:
+        return override
+    if SOURCE_BASE_URL:
+        return f"{SOURCE_BASE_URL.rstrip('/')}/{name}.{kind}"
+    return default
+
+
+def _write_atomic(path: str, data: bytes):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _columnar(frame: pd.DataFrame) -> pd.DataFrame:
+    # Excel columns such as WGI "estimate" mix numbers and ".."; Parquet needs
+    # one type per column, so non-null values of object columns become strings
+    frame = frame.copy()
+    for col in frame.columns[frame.dtypes == object]:
+        frame[col] = frame[col].where(frame[col].isna(), frame[col].astype(str))
+    return frame
+
+
+class SourceCache:
+    def __init__(self, directory: str = SOURCE_CACHE_DIR, timeout: float = 60, max_age: float = MAX_AGE):
+        self.directory = directory
+        self.timeout = timeout
+        self.max_age = max_age
+        os.makedirs(directory, exist_ok=True)
+
+    def _paths(self, name: str, kind: str) -> Tuple[str, str]:
+        return os.path.join(self.directory, f"{name}.{kind}"), os.path.join(self.directory, f"{name}.json")
+
+    def _cached(self, name: str, kind: str, url: str) -> Tuple[Optional[bytes], dict]:
+        """The cached bytes and their record, or ``(None, {})`` if missing, stale or corrupt."""
+        data_path, meta_path = self._paths(name, kind)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            with open(data_path, "rb") as f:
+                data = f.read()
+        except (OSError, ValueError):
+            return None, {}
+        if meta.get("url") != url or hashlib.sha256(data).hexdigest() != meta.get("sha256"):
+            return None, {}
+        return data, meta
+
+    def fetch(self, name: str, kind: str, url: str) -> bytes:
+        """Return the source's bytes, downloading them only if they changed."""
+        data, meta = self._cached(name, kind, url)
+        if data is not None and time.time() - meta.get("checked_at", 0) < self.max_age:
+            return data
+
+        request = urllib.request.Request(url)
+        if data is not None:
+            if meta.get("etag"):
+                request.add_header("If-None-Match", meta["etag"])
+            if meta.get("last_modified"):
+                request.add_header("If-Modified-Since", meta["last_modified"])
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                body = response.read()
+                headers = response.headers
+        except (urllib.error.URLError, OSError) as e:
+            if data is None:
+                raise
+            if getattr(e, "code", None) != 304:
+                logger.warning("Could not fetch %s (%s); using the cached %s", url, e, name)
+                return data
+            body, headers = data, e.headers
+
+        sha256 = hashlib.sha256(body).hexdigest()
+        data_path, meta_path = self._paths(name, kind)
+        if sha256 != meta.get("sha256"):
+            _write_atomic(data_path, body)
+            meta = {"url": url, "sha256": sha256, "bytes": len(body), "fetched_at": time.time()}
+        meta.update({
+            "etag": headers.get("ETag") or meta.get("etag"),
+            "last_modified": headers.get("Last-Modified") or meta.get("last_modified"),
+            "checked_at": time.time(),
+        })
+        _write_atomic(meta_path, json.dumps(meta, indent=2).encode())
+        return body
+
+    def fetch_all(self, sources: Dict[str, Tuple[str, str]], max_workers: int = 4) -> Dict[str, bytes]:
+        """Fetch ``{name: (kind, url)}`` concurrently; returns ``{name: bytes}``."""
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fetch") as executor:
+            futures = {name: executor.submit(self.fetch, name, kind, url) for name, (kind, url) in sources.items()}
+            return {name: future.result() for name, future in futures.items()}
+
+    def read_excel(self, name: str, data: bytes) -> pd.DataFrame:
+        """Parse an Excel source, reusing the Parquet copy written for the same bytes."""
+        parquet_path = os.path.join(self.directory, f"{name}-{hashlib.sha256(data).hexdigest()[:16]}.parquet")
+        if os.path.exists(parquet_path):
+            return pd.read_parquet(parquet_path)
+        frame = _columnar(pd.read_excel(io.BytesIO(data)))
+        tmp_path = f"{parquet_path}.tmp"
+        frame.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, parquet_path)
+        for stale in glob.glob(os.path.join(self.directory, f"{name}-*.parquet")):
+            if stale != parquet_path:
+                os.remove(stale)
+        return frame
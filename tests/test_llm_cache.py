@@ -0,0 +1,60 @@
+"""The on-disk LLM cache: repeat lookups, TTL expiry and LRU eviction.
+
+    python -m pytest tests/test_llm_cache.py
+"""
+import asyncio
+import itertools
+import os
+import sys
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import llm_cache  # noqa: E402
+from bench_naics_pipeline import FakeAsyncClient  # noqa: E402
+from llm_cache import SQLiteLLMCache  # noqa: E402
+from policymaker_ai import ProductToNAICSPipeline  # noqa: E402
+
+
+def test_repeat_lookup_makes_no_new_calls(tmp_path):
+    cache = SQLiteLLMCache(str(tmp_path / "llm_cache.sqlite3"))
+    client = FakeAsyncClient(latency=0, components=3)
+    pipeline = ProductToNAICSPipeline(client, cache=cache)
+
+    first = asyncio.run(pipeline.lookup_product("laptop"))
+    calls = client.calls
+    assert calls == 4  # one decomposition plus one mapping per component
+    assert asyncio.run(pipeline.lookup_product("laptop")) == first
+    assert client.calls == calls
+    assert cache.stats() == {"hits": 4, "misses": 4, "entries": 4}
+    cache.close()
+
+
+def test_expired_entry_is_a_miss(tmp_path, monkeypatch):
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(llm_cache, "time", SimpleNamespace(time=lambda: clock.now))
+    cache = SQLiteLLMCache(str(tmp_path / "llm_cache.sqlite3"), ttl_seconds=60)
+    cache.set("model", "system", "user", "answer")
+
+    clock.now += 59
+    assert cache.get("model", "system", "user") == "answer"
+    clock.now += 2
+    assert cache.get("model", "system", "user") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path, monkeypatch):
+    ticks = itertools.count(1000)
+    monkeypatch.setattr(llm_cache, "time", SimpleNamespace(time=lambda: float(next(ticks))))
+    cache = SQLiteLLMCache(str(tmp_path / "llm_cache.sqlite3"), max_entries=2)
+    cache.set("model", "system", "a", "A")
+    cache.set("model", "system", "b", "B")
+    assert cache.get("model", "system", "a") == "A"  # "b" is now the oldest
+
+    cache.set("model", "system", "c", "C")
+    assert cache.get("model", "system", "b") is None
+    assert cache.get("model", "system", "a") == "A"
+    assert cache.get("model", "system", "c") == "C"
+    assert cache.stats()["entries"] == 2
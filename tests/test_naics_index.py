@@ -0,0 +1,45 @@
+"""Local NAICS matching must not over-claim confidence.
+
+    python -m pytest tests/test_naics_index.py
+"""
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from naics_index import NAICSIndex  # noqa: E402
+from policymaker_ai import LOCAL_MATCH_THRESHOLD  # noqa: E402
+
+LABEL = "Motor Vehicle Body Manufacturing"
+
+
+def crosswalk_index() -> NAICSIndex:
+    index = NAICSIndex(pd.DataFrame({"NAICS_code": ["336211", "335912"], "END_USE": ["Vehicles", "Batteries"]}))
+    index.add(LABEL, "336211", LABEL)
+    index.add("Primary Battery Manufacturing", "335912", "Primary Battery Manufacturing")
+    return index
+
+
+def test_single_token_does_not_take_a_longer_label():
+    index = crosswalk_index()
+    for component in ("motor", "body", "Manufacturing"):
+        match = index.match(component)
+        assert match is not None
+        assert match[1] < LOCAL_MATCH_THRESHOLD, component
+
+
+def test_full_label_still_matches():
+    mapping, score = crosswalk_index().match("motor vehicle bodies manufacturing")
+    assert mapping["NAICS_code"] == "336211"
+    assert score == 1.0
+
+
+def test_learned_component_is_scoped_to_its_product():
+    index = crosswalk_index()
+    index.add("motor", "336211", LABEL, context="pickup truck")
+
+    assert index.match("motor", context="pickup truck") == ({"NAICS_code": "336211", "NAICS_label": LABEL}, 1.0)
+    _, score = index.match("motor", context="drone")
+    assert score < LOCAL_MATCH_THRESHOLD
@@ -0,0 +1,97 @@
+"""An incremental refresh must serve the same table as a full rebuild.
+
+    python -m pytest tests/test_refresh.py
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from risk_engine import RiskEngine  # noqa: E402
+from risk_pipeline import build_snapshot, latest_version, read_sources, refresh_snapshot  # noqa: E402
+from synthetic_data import generate_sources, to_raw  # noqa: E402
+
+YEAR_COLUMNS = {"imports": "Year", "lpi": "Year", "wgi": "year", "consumption": "Year"}
+
+
+def sources(n_years: int) -> dict:
+    return generate_sources(n_countries=20, n_commodities=6, n_years=n_years, seed=7)
+
+
+def rows_for_year(frames: dict, year: int) -> dict:
+    return {name: frame[frame[YEAR_COLUMNS[name]] == year].reset_index(drop=True)
+            for name, frame in frames.items()}
+
+
+def combine(base: dict, new: dict) -> dict:
+    return {name: pd.concat([base[name], new[name]], ignore_index=True) for name in base}
+
+
+def served_engine(snapshot_dir: str) -> RiskEngine:
+    return RiskEngine.from_arrow(os.path.join(snapshot_dir, latest_version(snapshot_dir)))
+
+
+def assert_same_table(refreshed: RiskEngine, rebuilt: RiskEngine):
+    assert refreshed.group_keys == rebuilt.group_keys
+    np.testing.assert_array_equal(refreshed.country_names[refreshed.country_codes],
+                                  rebuilt.country_names[rebuilt.country_codes])
+    np.testing.assert_allclose(refreshed.risk, rebuilt.risk, rtol=1e-5)
+
+
+def refresh_and_rebuild(tmp_path, base: dict, updates: dict, combined: dict) -> dict:
+    refreshed_dir, rebuilt_dir = str(tmp_path / "refreshed"), str(tmp_path / "rebuilt")
+    build_snapshot(refreshed_dir, raw=to_raw(base))
+    # Round-trip the updates through file bytes, as `risk_pipeline.py refresh` reads them
+    manifest = refresh_snapshot(read_sources(to_raw(updates)), refreshed_dir)
+    build_snapshot(rebuilt_dir, raw=to_raw(combined))
+    assert_same_table(served_engine(refreshed_dir), served_engine(rebuilt_dir))
+    return manifest
+
+
+def test_new_year_within_bounds(tmp_path):
+    base = sources(n_years=3)
+    last = int(base["lpi"]["Year"].max())
+    # Repeating last year's values keeps every global min/max where it was
+    new = rows_for_year(base, last)
+    for name, frame in new.items():
+        frame[YEAR_COLUMNS[name]] = last + 1
+
+    manifest = refresh_and_rebuild(tmp_path, base, new, combine(base, new))
+    assert not manifest["renormalized"]
+    assert all(year == last + 1 for _, year in manifest["affected_groups"])
+
+
+def test_new_year_shifting_bounds(tmp_path):
+    frames = sources(n_years=4)
+    last = int(frames["lpi"]["Year"].max())
+    base = {name: frame[frame[YEAR_COLUMNS[name]] < last] for name, frame in frames.items()}
+    new = rows_for_year(frames, last)
+    new["imports"]["ImportValueUSD"] *= 100  # far above anything in the base years
+
+    manifest = refresh_and_rebuild(tmp_path, base, new, combine(base, new))
+    assert manifest["renormalized"]
+    assert "ImportValueUSD" in manifest["shifted_columns"]
+
+
+def test_partial_wgi_revision(tmp_path):
+    base = sources(n_years=3)
+    wgi = base["wgi"]
+    # Revise a single indicator of one country-year; its other indicators must survive
+    revised = wgi[(wgi["indicator"] == "rl") & (wgi["estimate"] != "..")].head(1).copy()
+    revised["estimate"] = 0.0
+    combined = dict(base, wgi=wgi.copy())
+    combined["wgi"].loc[revised.index, "estimate"] = 0.0
+
+    updates = {"wgi": revised.reset_index(drop=True)}
+    refreshed_dir, rebuilt_dir = str(tmp_path / "refreshed"), str(tmp_path / "rebuilt")
+    build_snapshot(refreshed_dir, raw=to_raw(base))
+    manifest = refresh_snapshot(updates, refreshed_dir)
+    build_snapshot(rebuilt_dir, raw=to_raw(combined))
+
+    assert manifest["rows"] == len(served_engine(rebuilt_dir).risk)
+    assert_same_table(served_engine(refreshed_dir), served_engine(rebuilt_dir))
@@ -0,0 +1,204 @@
+"""Train the Hack1 RandomForest risk model and save it as a versioned artifact.
+
+    python train_risk_model.py
+
+Writes ``<model_dir>/<version>/`` with the fitted scaler and classifier
+(``model.joblib``), the precomputed ``predictions.parquet`` the dashboard
+serves, and a ``manifest.json`` with the feature schema (column, dtype),
+its hash and stage timings. ``<model_dir>/LATEST`` names the version
+``Hack1`` loads. ``load_artifact(load_model=True)`` refuses a model whose
+schema does not match ``features`` (or the dtypes of the frame it will
+score).
+"""
+import argparse
+import hashlib
+import json
+import os
+import time
+
+import joblib
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import classification_report
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import StandardScaler
+
+MODEL_DIR = os.environ.get("RISK_MODEL_DIR", "models")
+IMPORTS_PATH = r"C:\Users\aishw\Downloads\Cleaned_U_S_Imports_from_2012.csv"
+LPI_PATH = r"C:\Users\aishw\Downloads\Interpolated_LPI_2015-2024.csv"
+WGI_PATH = r"C:\Users\aishw\Downloads\widget1.xlsx"
+
+features = ["DependencyShare", "LPI_Score", "WGI_ControlOfCorruption", "WGI_GovtEffectiveness",
+            "WGI_PoliticalStability", "WGI_RuleOfLaw", "WGI_RegulatoryQuality", "WGI_VoiceAccountability"]
+
+
+class FeatureSchemaMismatch(ValueError):
+    """The artifact was trained on different feature columns or dtypes."""
+
+
+def feature_schema(frame: pd.DataFrame) -> list:
+    return [[col, str(frame[col].dtype)] for col in features]
+
+
+def schema_hash(schema: list) -> str:
+    return hashlib.sha256(json.dumps(schema).encode()).hexdigest()[:16]
+
+
+def feature_schema_hash(frame: pd.DataFrame) -> str:
+    return schema_hash(feature_schema(frame))
+
+
+def check_feature_schema(manifest: dict, model_features: list, frame: pd.DataFrame = None):
+    """Raise ``FeatureSchemaMismatch`` unless the model fits ``features`` and ``frame``'s dtypes."""
+    expected = manifest["feature_schema_hash"]
+    if list(model_features) != features or manifest.get("features") != features:
+        raise FeatureSchemaMismatch(f"Model {manifest['version']} was trained on {list(model_features)}, "
+                                    f"expected {features}")
+    stored = manifest.get("feature_schema")
+    if stored is not None and ([col for col, _ in stored] != features or schema_hash(stored) != expected):
+        raise FeatureSchemaMismatch(f"Model {manifest['version']} has a feature schema that does not "
+                                    f"match its hash {expected}")
+    if frame is not None:
+        missing = [col for col in features if col not in frame.columns]
+        if missing:
+            raise FeatureSchemaMismatch(f"Frame is missing feature columns {missing}")
+        if feature_schema_hash(frame) != expected:
+            raise FeatureSchemaMismatch(f"Frame dtypes {feature_schema(frame)} do not match model "
+                                        f"{manifest['version']} ({stored or expected})")
+
+
+# --- Load Raw Datasets ---
+def load_training_frame(imports_path: str, lpi_path: str, wgi_path: str) -> pd.DataFrame:
+    imports_df = pd.read_csv(imports_path)
+    lpi_df = pd.read_csv(lpi_path)
+    wgi_df = pd.read_excel(wgi_path)
+
+    # --- Clean and Merge ---
+    wgi_df_cleaned = wgi_df[wgi_df['estimate'] != '..'].copy()
+    wgi_df_cleaned["estimate"] = pd.to_numeric(wgi_df_cleaned["estimate"], errors="coerce")
+    wgi_pivot = wgi_df_cleaned.pivot_table(
+        index=["countryname", "year"],
+        columns="indicator",
+        values="estimate"
+    ).reset_index()
+    wgi_pivot.columns.name = None
+    wgi_pivot = wgi_pivot.rename(columns={
+        "countryname": "Country",
+        "year": "Year",
+        "cc": "WGI_ControlOfCorruption",
+        "ge": "WGI_GovtEffectiveness",
+        "rl": "WGI_RuleOfLaw",
+        "rq": "WGI_RegulatoryQuality",
+        "va": "WGI_VoiceAccountability",
+        "pv": "WGI_PoliticalStability"
+    })
+
+    lpi_clean = lpi_df[["Country", "Year", "LPI_Score_Interpolated"]].rename(
+        columns={"LPI_Score_Interpolated": "LPI_Score"})
+
+    imports_clean = imports_df[imports_df["Country"] != "World Total"].copy()
+
+    merged = imports_clean.merge(lpi_clean, on=["Country", "Year"], how="left")
+    merged = merged.merge(wgi_pivot, on=["Country", "Year"], how="left")
+
+    filtered_df = merged.dropna(subset=[
+        "ImportValueUSD", "LPI_Score",
+        "WGI_ControlOfCorruption", "WGI_GovtEffectiveness",
+        "WGI_PoliticalStability", "WGI_RuleOfLaw",
+        "WGI_RegulatoryQuality", "WGI_VoiceAccountability"
+    ]).copy()
+
+    # --- Feature Engineering ---
+    commodity_totals = filtered_df.groupby(["Commodity", "Year"])["ImportValueUSD"].transform("sum")
+    filtered_df["DependencyShare"] = filtered_df["ImportValueUSD"] / commodity_totals
+    return filtered_df
+
+
+# --- Training ---
+def train(filtered_df: pd.DataFrame, n_jobs: int = -1):
+    timings = {}
+    started = time.perf_counter()
+    X = filtered_df[features]
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X)
+
+    # Create Risk Level labels via quantile binning for supervised training
+    y = pd.qcut(filtered_df["DependencyShare"], q=3, labels=["Low", "Medium", "High"])
+
+    X_train, X_test, y_train, y_test = train_test_split(X_scaled, y, stratify=y, test_size=0.3, random_state=42)
+    timings["prepare_seconds"] = round(time.perf_counter() - started, 3)
+
+    # n_jobs=-1 builds the 200 trees on every core
+    started = time.perf_counter()
+    clf = RandomForestClassifier(n_estimators=200, max_depth=10, random_state=42, n_jobs=n_jobs)
+    clf.fit(X_train, y_train)
+    timings["fit_seconds"] = round(time.perf_counter() - started, 3)
+    report = classification_report(y_test, clf.predict(X_test), output_dict=True)
+
+    started = time.perf_counter()
+    predictions = filtered_df[["Country", "Year", "Commodity"]].copy()
+    predictions["PredictedRisk"] = clf.predict(X_scaled)
+    timings["predict_seconds"] = round(time.perf_counter() - started, 3)
+    return scaler, clf, predictions, timings, report
+
+
+def save_artifact(model_dir: str, scaler, clf, predictions: pd.DataFrame, manifest: dict) -> str:
+    version = f"{time.strftime('%Y%m%d%H%M%S', time.gmtime())}-{manifest['feature_schema_hash'][:8]}"
+    version_dir = os.path.join(model_dir, version)
+    os.makedirs(version_dir, exist_ok=True)
+    joblib.dump({"scaler": scaler, "model": clf, "features": features}, os.path.join(version_dir, "model.joblib"))
+    predictions.to_parquet(os.path.join(version_dir, "predictions.parquet"), index=False)
+    with open(os.path.join(version_dir, "manifest.json"), "w") as f:
+        json.dump({"version": version, **manifest}, f, indent=2)
+
+    latest_tmp = os.path.join(model_dir, "LATEST.tmp")
+    with open(latest_tmp, "w") as f:
+        f.write(version)
+    os.replace(latest_tmp, os.path.join(model_dir, "LATEST"))
+    return version
+
+
+def load_artifact(model_dir: str = MODEL_DIR, load_model: bool = False, frame: pd.DataFrame = None) -> dict:
+    """Load the LATEST artifact's manifest and predictions (and the model if asked).
+
+    The model is only returned if its feature schema matches ``features``
+    and, when given, the dtypes of ``frame``.
+    """
+    with open(os.path.join(model_dir, "LATEST")) as f:
+        version_dir = os.path.join(model_dir, f.read().strip())
+    with open(os.path.join(version_dir, "manifest.json")) as f:
+        artifact = {"manifest": json.load(f)}
+    artifact["predictions"] = pd.read_parquet(os.path.join(version_dir, "predictions.parquet"))
+    if load_model:
+        bundle = joblib.load(os.path.join(version_dir, "model.joblib"))
+        check_feature_schema(artifact["manifest"], bundle["features"], frame)
+        artifact.update(bundle)
+    return artifact
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train and save the Hack1 risk model.")
+    parser.add_argument("--imports", default=IMPORTS_PATH)
+    parser.add_argument("--lpi", default=LPI_PATH)
+    parser.add_argument("--wgi", default=WGI_PATH)
+    parser.add_argument("--model-dir", default=MODEL_DIR)
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    filtered_df = load_training_frame(args.imports, args.lpi, args.wgi)
+    load_seconds = round(time.perf_counter() - started, 3)
+    scaler, clf, predictions, timings, report = train(filtered_df, n_jobs=args.n_jobs)
+    manifest = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "features": features,
+        "feature_schema": feature_schema(filtered_df),
+        "feature_schema_hash": feature_schema_hash(filtered_df),
+        "rows": len(filtered_df),
+        "n_jobs": args.n_jobs,
+        "timings": {"load_seconds": load_seconds, **timings},
+        "test_accuracy": round(report["accuracy"], 4),
+    }
+    version = save_artifact(args.model_dir, scaler, clf, predictions, manifest)
+    print(f"Saved model {version}: {json.dumps(manifest['timings'])}, "
+          f"test accuracy {manifest['test_accuracy']}")